@@ -19,6 +19,7 @@ sys.path.append(str(Path(__file__).parent / "src"))
 
 from logging_conf import logger
 from config import PDF_DIR, USER_AGENT, CSV_CADRI_DOCS
+from store_csv import CSVStore
 
 
 class CertMovDirectDownloader:
@@ -258,8 +259,10 @@ class CertMovDirectDownloader:
                     logger.debug(f"Conteúdo não é PDF válido")
                     continue
 
-                # Save PDF
-                pdf_path.write_bytes(response.content)
+                # Save PDF (written aside and renamed, so a parser never sees a partial file)
+                part_path = pdf_path.with_suffix('.pdf.part')
+                part_path.write_bytes(response.content)
+                part_path.replace(pdf_path)
                 file_size = len(response.content)
                 file_hash = self._calculate_file_hash(pdf_path)
 
@@ -291,21 +294,22 @@ class CertMovDirectDownloader:
     ):
         """Atualiza status do PDF no CSV"""
         try:
-            df = pd.read_csv(CSV_CADRI_DOCS)
-
-            # Encontrar documento
-            mask = df['numero_documento'] == numero_documento
-            if mask.any():
-                df.loc[mask, 'status_pdf'] = status
-                if pdf_hash:
-                    df.loc[mask, 'pdf_hash'] = pdf_hash
-                if url_used:
-                    df.loc[mask, 'url_pdf_real'] = url_used
-                df.loc[mask, 'updated_at'] = datetime.now().isoformat()
-
-                # Salvar
-                df.to_csv(CSV_CADRI_DOCS, index=False)
-                logger.debug(f"Status atualizado: {numero_documento} -> {status}")
+            with CSVStore.write_lock:
+                df = pd.read_csv(CSV_CADRI_DOCS)
+
+                # Encontrar documento
+                mask = df['numero_documento'] == numero_documento
+                if mask.any():
+                    df.loc[mask, 'status_pdf'] = status
+                    if pdf_hash:
+                        df.loc[mask, 'pdf_hash'] = pdf_hash
+                    if url_used:
+                        df.loc[mask, 'url_pdf_real'] = url_used
+                    df.loc[mask, 'updated_at'] = datetime.now().isoformat()
+
+                    # Salvar
+                    df.to_csv(CSV_CADRI_DOCS, index=False)
+                    logger.debug(f"Status atualizado: {numero_documento} -> {status}")
         except Exception as e:
             logger.error(f"Erro ao atualizar status: {e}")
 
@@ -34,6 +34,8 @@ class DoclingPDFParser:
     def __init__(self):
         self.pdf_dir = PDF_DIR
         self.converter = None
+        # Documents already attempted by this instance, with or without items
+        self.parsed_cache = set()
         self.stats = {
             'processed': 0,
             'items_extracted': 0,
@@ -88,10 +90,12 @@ class DoclingPDFParser:
         for pdf_file in pdf_files:
             try:
                 # Check if already parsed (unless force reparse)
-                if not force_reparse and self._is_already_parsed(pdf_file.stem):
+                if not force_reparse and (pdf_file.stem in self.parsed_cache
+                                          or self._is_already_parsed(pdf_file.stem)):
                     logger.debug(f"Skipping {pdf_file.stem} - already parsed")
                     self.stats['skipped'] += 1
                     continue
+                self.parsed_cache.add(pdf_file.stem)
 
                 items = self.parse_pdf(pdf_file)
 
@@ -374,7 +378,8 @@ class DoclingPDFParser:
             # Fallback save with basic structure
             try:
                 df_basic = pd.DataFrame(items)
-                df_basic.to_csv(CSV_CADRI_ITEMS, mode='a', header=not CSV_CADRI_ITEMS.exists(), index=False)
+                with CSVStore.write_lock:
+                    df_basic.to_csv(CSV_CADRI_ITEMS, mode='a', header=not CSV_CADRI_ITEMS.exists(), index=False)
                 logger.info(f"✅ Salvos {len(items)} itens em {CSV_CADRI_ITEMS} (fallback)")
             except Exception as e2:
                 logger.error(f"Fallback save also failed: {e2}")
@@ -18,6 +18,7 @@ sys.path.append(str(Path(__file__).parent / "src"))
 from browser import BrowserManager, FormHelper
 from logging_conf import logger
 from config import PDF_DIR, CSV_CADRI_DOCS, RATE_MIN, RATE_MAX
+from store_csv import CSVStore
 from pdf_url_builder import parse_autenticidade_url
 
 
@@ -121,7 +122,10 @@ class InteractivePDFDownloader:
 
                         # Processar download
                         download = await download_info.value
-                        await download.save_as(pdf_path)
+                        # Salvar ao lado e renomear: o parser nunca vê um PDF incompleto
+                        part_path = pdf_path.with_suffix('.pdf.part')
+                        await download.save_as(part_path)
+                        part_path.replace(pdf_path)
 
                         # Verificar se é PDF válido
                         if pdf_path.exists() and pdf_path.stat().st_size > 0:
@@ -209,19 +213,20 @@ class InteractivePDFDownloader:
     ):
         """Atualiza status do PDF no CSV"""
         try:
-            df = pd.read_csv(CSV_CADRI_DOCS)
-
-            # Encontrar documento
-            mask = df['numero_documento'] == numero_documento
-            if mask.any():
-                df.loc[mask, 'status_pdf'] = status
-                if pdf_hash:
-                    df.loc[mask, 'pdf_hash'] = pdf_hash
-                df.loc[mask, 'updated_at'] = datetime.now().isoformat()
-
-                # Salvar
-                df.to_csv(CSV_CADRI_DOCS, index=False)
-                logger.debug(f"Status atualizado: {numero_documento} -> {status}")
+            with CSVStore.write_lock:
+                df = pd.read_csv(CSV_CADRI_DOCS)
+
+                # Encontrar documento
+                mask = df['numero_documento'] == numero_documento
+                if mask.any():
+                    df.loc[mask, 'status_pdf'] = status
+                    if pdf_hash:
+                        df.loc[mask, 'pdf_hash'] = pdf_hash
+                    df.loc[mask, 'updated_at'] = datetime.now().isoformat()
+
+                    # Salvar
+                    df.to_csv(CSV_CADRI_DOCS, index=False)
+                    logger.debug(f"Status atualizado: {numero_documento} -> {status}")
         except Exception as e:
             logger.error(f"Erro ao atualizar status: {e}")
 
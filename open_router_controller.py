@@ -1,5 +1,10 @@
 import os
-from openai import OpenAI
+import asyncio
+import contextlib
+import random
+from openai import (
+    OpenAI, AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError, NOT_GIVEN
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,6 +24,8 @@ class OpenRouterController():
             base_url="https://openrouter.ai/api/v1",
             api_key=openrouter_api_key,
         )
+        self.api_key = openrouter_api_key
+        self.async_client = None
         self.models = {
             'cost-optimized': 'google/gemini-2.5-flash',
             'flagship': 'google/gemini-2.5-pro',
@@ -34,6 +41,37 @@ class OpenRouterController():
         self.responses = []
 
 
+    # Transient failures (429, 5xx, timeouts/connection drops) are retried by
+    # asingle_request with jittered exponential backoff before giving up
+    RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+    RETRY_ATTEMPTS = 5
+    RETRY_INITIAL_DELAY = 1.0
+    RETRY_MAX_DELAY = 30.0
+
+    # Providers that only reuse a prompt prefix when it is marked with cache_control
+    # (OpenAI and DeepSeek cache long identical prefixes automatically)
+    CACHE_CONTROL_PREFIXES = ('anthropic/', 'google/')
+
+    def _system_message(self, system_prompt, model):
+        # The system prompt is the static prefix of every request; keep it
+        # first and unchanged so provider prompt caches can reuse it
+        if self.models[model].startswith(self.CACHE_CONTROL_PREFIXES):
+            return {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"}
+                    }
+                ]
+            }
+        return {
+            "role": "system",
+            "content": system_prompt
+        }
+
+
     def direct_chat_completion(self, system_prompt: str, message: str, custom_id: str, model='batch'):
         try:
             completion = self.client.chat.completions.create(
@@ -43,10 +81,7 @@ class OpenRouterController():
                 },
                 model=self.models[model],
                 messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
+                    self._system_message(system_prompt, model),
                     {
                         "role": "user",
                         "content": message
@@ -71,7 +106,7 @@ class OpenRouterController():
             return None  
 
 
-    def single_request(self, system_prompt, message, model='cost-optimized', temperature=0.1):
+    def single_request(self, system_prompt, message, model='cost-optimized', temperature=0.1, response_format=None):
         try:
             completion = self.client.chat.completions.create(
                 extra_headers={
@@ -80,20 +115,83 @@ class OpenRouterController():
                 },
                 model=self.models[model],
                 messages=[
-                    {
-                        "role": "system", 
-                        "content": system_prompt
-                    },
+                    self._system_message(system_prompt, model),
                     {
                         "role": "user",
                         "content": message
                     }
                 ],
-                temperature=temperature
+                temperature=temperature,
+                response_format=response_format or NOT_GIVEN
             )
             
             return completion.choices[0].message.content
             
         except Exception as e:
             print(f'[ERROR] Single request failed: {str(e)}')
-            return None
\ No newline at end of file
+            return None
+
+
+    @contextlib.asynccontextmanager
+    async def async_session(self, http_client=None):
+        # AsyncOpenAI's connection pool is bound to the running event loop,
+        # so each asyncio.run gets its own client, closed on exit.
+        # An injected httpx.AsyncClient is owned (and closed) by the caller
+        self.async_client = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=self.api_key,
+            http_client=http_client,
+            max_retries=0,  # retries are handled (with a longer backoff) in asingle_request
+        )
+        try:
+            yield self
+        finally:
+            if http_client is None:
+                await self.async_client.close()
+            self.async_client = None
+
+
+    def _retry_delay(self, error, attempt):
+        # Honor the server's Retry-After on 429s, otherwise full-jitter exponential backoff
+        if isinstance(error, RateLimitError):
+            retry_after = error.response.headers.get('retry-after')
+            try:
+                return min(float(retry_after), self.RETRY_MAX_DELAY)
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.RETRY_INITIAL_DELAY * 2 ** attempt, self.RETRY_MAX_DELAY))
+
+
+    async def asingle_request(self, system_prompt, message, model='cost-optimized', temperature=0.1, response_format=None):
+        for attempt in range(self.RETRY_ATTEMPTS):
+            try:
+                completion = await self.async_client.chat.completions.create(
+                    extra_headers={
+                        "HTTP-Referer": "https://equitas.com.br",
+                        "X-Title": "Credit Guide ETL",
+                    },
+                    model=self.models[model],
+                    messages=[
+                        self._system_message(system_prompt, model),
+                        {
+                            "role": "user",
+                            "content": message
+                        }
+                    ],
+                    temperature=temperature,
+                    response_format=response_format or NOT_GIVEN
+                )
+
+                return completion.choices[0].message.content
+
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == self.RETRY_ATTEMPTS - 1:
+                    print(f'[ERROR] Async single request failed after {self.RETRY_ATTEMPTS} attempts: {str(e)}')
+                    return None
+                delay = self._retry_delay(e, attempt)
+                print(f'[WARN] Async single request failed ({type(e).__name__}), retrying in {delay:.1f}s')
+                await asyncio.sleep(delay)
+
+            except Exception as e:
+                print(f'[ERROR] Async single request failed: {str(e)}')
+                return None
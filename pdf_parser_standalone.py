@@ -1066,6 +1066,9 @@ class PDFParserStandalone:
         for i, pdf_path in enumerate(pending, 1):
             logger.info(f"[{i}/{len(pending)}] Processando: {pdf_path.name}")
 
+            # Não reprocessar na próxima chamada desta instância, mesmo sem itens
+            self.parsed_cache.add(pdf_path.stem)
+
             try:
                 items = self.parse_pdf(pdf_path)
 
@@ -1141,7 +1144,8 @@ class PDFParserStandalone:
                 for col in df_fallback.select_dtypes(include=['object']).columns:
                     df_fallback[col] = df_fallback[col].astype(str).str.replace('\n', ' ').str.replace('\r', ' ')
 
-                df_fallback.to_csv(CSV_CADRI_ITEMS, index=False, encoding='utf-8', quoting=1)
+                with CSVStore.write_lock:
+                    df_fallback.to_csv(CSV_CADRI_ITEMS, index=False, encoding='utf-8', quoting=1)
                 logger.info(f"✅ Salvos {len(items)} itens em {CSV_CADRI_ITEMS} (fallback)")
             except Exception as e2:
                 logger.error(f"Erro no fallback: {e2}")
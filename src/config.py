@@ -15,6 +15,8 @@ BROWSER_TIMEOUT = int(os.getenv("BROWSER_TIMEOUT", "30000"))
 # Scraping limits
 MAX_PAGES = int(os.getenv("MAX_PAGES", "10"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+LIST_CONCURRENCY = int(os.getenv("LIST_CONCURRENCY", "4"))  # searches (browsers) running at once in stage_list
+DETAIL_CONCURRENCY = int(os.getenv("DETAIL_CONCURRENCY", "4"))  # detail scraping threads in stage_detail
 
 # User agent
 USER_AGENT = os.getenv(
@@ -41,6 +43,8 @@ CSV_DIR.mkdir(exist_ok=True)
 CSV_EMPRESAS = CSV_DIR / "empresas.csv"
 CSV_CADRI_DOCS = CSV_DIR / "cadri_documentos.csv"
 CSV_CADRI_ITEMS = CSV_DIR / "cadri_itens.csv"
+CSV_CADRI_ITEMS_STAGING = CSV_DIR / "cadri_itens.staging.csv"  # append-only, folded at end of run
+CSV_CADRI_ITEMS_REGEX_STAGING = CSV_DIR / "cadri_itens.regex.staging.csv"  # same, for parse_pdf.PDFParser
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -48,10 +52,13 @@ LOG_FILE = DATA_DIR / "scraper.log"
 
 # PDF parsing
 PDF_TIMEOUT = int(os.getenv("PDF_TIMEOUT", "60"))
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto").lower()  # auto, pymupdf or pdfium
+KEEP_RAW_FRAGMENTS = os.getenv("KEEP_RAW_FRAGMENTS", "true").lower() == "true"  # debug text per parsed item
 
 # Pipeline
 RESUME_ENABLED = os.getenv("RESUME_ENABLED", "true").lower() == "true"
 CHECKPOINT_INTERVAL = int(os.getenv("CHECKPOINT_INTERVAL", "100"))
+CHECKPOINT_MIN_SECONDS = float(os.getenv("CHECKPOINT_MIN_SECONDS", "30"))  # min time between checkpoint saves
 
 # Document type to filter
 TARGET_DOC_TYPE = "CERT MOV RESIDUOS INT AMB"
@@ -60,8 +67,17 @@ TARGET_DOC_TYPE = "CERT MOV RESIDUOS INT AMB"
 LLM_PARSER_ENABLED = os.getenv("LLM_PARSER_ENABLED", "true").lower() == "true"
 LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gpt-5-mini")
 LLM_MAX_TEXT_LENGTH = int(os.getenv("LLM_MAX_TEXT_LENGTH", "15000"))
+LLM_MAX_TEXT_TOKENS = int(os.getenv("LLM_MAX_TEXT_TOKENS", "4000"))  # 0 = truncate by characters only
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
 LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "100"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_DOCS_PER_REQUEST = int(os.getenv("LLM_DOCS_PER_REQUEST", "4"))
+LLM_JSON_SCHEMA = os.getenv("LLM_JSON_SCHEMA", "true").lower() == "true"  # native structured output
+LLM_CACHE_FILE = DATA_DIR / "llm_cache.sqlite"
+
+# OpenAI Batch API (offline bulk runs; OpenRouter has no batch endpoint)
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+LLM_BATCH_DIR = DATA_DIR / "llm_batches"
 
 # OpenRouter API Configuration (inherited from OpenRouterController)
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
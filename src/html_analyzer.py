@@ -9,13 +9,44 @@ identificar padrões e melhorar a extração de dados.
 import re
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import json
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+# orjson is optional - noticeably faster when dumping large nested reports
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
 
 from utils_text import normalize_text, extract_document_number, parse_date_br
 from config import TARGET_DOC_TYPE
-from logging_conf import logger
+from logging_conf import logger, init_worker_logging, worker_mp_context
+
+
+# Precompiled patterns shared by every analyzed file
+_TARGET_CTX_RE = re.compile(rf'.{{0,100}}{re.escape(TARGET_DOC_TYPE.lower())}.{{0,100}}', re.IGNORECASE)
+_NUM_RE = re.compile(r'\b\d{4,10}\b')
+_LONG_NUM_RE = re.compile(r'\b\d{4,}\b')
+_DATE_RE = re.compile(r'\b\d{1,2}/\d{1,2}/\d{4}\b')
+_URL_COMMENT_RE = re.compile(rb'<!-- URL: (.*?) -->')
+_DOC_CONTAINER_CLASS_RE = re.compile(r'doc|cert|result', re.I)
+# A line whose first run of 3+ digits has 4+ digits (same rule as
+# extract_document_number + length filter), capturing the whole line as context
+_DOC_NUM_LINE_RE = re.compile(
+    r'^(?P<line>(?:[^\d\n]|(?<!\d)\d{1,2}(?!\d))*(?P<number>\d{4,})[^\n]*)',
+    re.MULTILINE
+)
+
+
+def _dumps(obj) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8')
 
 
 class HTMLAnalyzer:
@@ -28,50 +59,64 @@ class HTMLAnalyzer:
         """Analyze a single HTML file"""
         logger.info(f"Analyzing HTML file: {html_file}")
 
-        with open(html_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Raw bytes - the parser detects the page encoding itself
+        content = html_file.read_bytes()
 
         # Extract URL from HTML comment if present
-        url_match = re.search(r'<!-- URL: (.*?) -->', content)
-        url = url_match.group(1) if url_match else "Unknown"
+        url_match = _URL_COMMENT_RE.search(content)
+        url = url_match.group(1).decode('utf-8', errors='replace') if url_match else "Unknown"
+
+        soup = BeautifulSoup(content, 'lxml')
 
-        soup = BeautifulSoup(content, 'html.parser')
+        # Tree walks shared by the helpers below - compute each only once
+        text_content = soup.get_text()
+        text_lower = text_content.lower()
+        tables = soup.find_all('table')
+        links = soup.find_all('a')
 
         analysis = {
             'file': str(html_file),
             'url': url,
             'timestamp': datetime.now().isoformat(),
-            'basic_info': self._analyze_basic_structure(soup),
-            'text_analysis': self._analyze_text_content(soup),
-            'table_analysis': self._analyze_tables(soup),
+            'basic_info': self._analyze_basic_structure(soup, tables, links, content[:200]),
+            'text_analysis': self._analyze_text_content(text_content, text_lower),
+            'table_analysis': self._analyze_tables(tables),
             'form_analysis': self._analyze_forms(soup),
-            'link_analysis': self._analyze_links(soup),
-            'document_patterns': self._find_document_patterns(soup),
-            'potential_fixes': self._suggest_fixes(soup)
+            'link_analysis': self._analyze_links(links),
+            'document_patterns': self._find_document_patterns(soup, text_content, text_lower),
+            'potential_fixes': self._suggest_fixes(text_content, text_lower, tables)
         }
 
         return analysis
 
-    def _analyze_basic_structure(self, soup: BeautifulSoup) -> Dict:
+    def _analyze_basic_structure(self, soup: BeautifulSoup, tables: List, links: List,
+                                 head: bytes) -> Dict:
         """Analyze basic HTML structure"""
+        # One walk over the tree updates every counter instead of a find_all per tag
+        counts = {'div': 0, 'form': 0, 'input': 0, 'script': 0}
+        total_elements = 0
+        for element in soup.descendants:
+            if isinstance(element, Tag):
+                total_elements += 1
+                if element.name in counts:
+                    counts[element.name] += 1
+
         return {
             'title': soup.title.string if soup.title else None,
-            'total_elements': len(soup.find_all()),
-            'div_count': len(soup.find_all('div')),
-            'table_count': len(soup.find_all('table')),
-            'form_count': len(soup.find_all('form')),
-            'input_count': len(soup.find_all('input')),
-            'link_count': len(soup.find_all('a')),
-            'script_count': len(soup.find_all('script')),
-            'has_doctype': '<!DOCTYPE' in str(soup)[:200],
+            'total_elements': total_elements,
+            'div_count': counts['div'],
+            'table_count': len(tables),
+            'form_count': counts['form'],
+            'input_count': counts['input'],
+            'link_count': len(links),
+            'script_count': counts['script'],
+            'has_doctype': b'<!DOCTYPE' in head.upper(),
             'encoding_meta': bool(soup.find('meta', attrs={'charset': True}) or
                                 soup.find('meta', attrs={'http-equiv': 'Content-Type'}))
         }
 
-    def _analyze_text_content(self, soup: BeautifulSoup) -> Dict:
+    def _analyze_text_content(self, text_content: str, text_lower: str) -> Dict:
         """Analyze text content for keywords"""
-        text_content = soup.get_text()
-        text_lower = text_content.lower()
 
         # Key terms for CADRI documents
         keywords = {
@@ -90,35 +135,31 @@ class HTMLAnalyzer:
         target_matches = []
         if TARGET_DOC_TYPE.lower() in text_lower:
             # Find contexts where target type appears
-            target_pattern = re.compile(rf'.{{0,100}}{re.escape(TARGET_DOC_TYPE.lower())}.{{0,100}}', re.IGNORECASE)
-            matches = target_pattern.findall(text_content)
+            matches = _TARGET_CTX_RE.findall(text_content)
             target_matches = [match.strip() for match in matches[:5]]
 
-        # Look for document numbers
+        # Look for document numbers (first 10 lines carrying one)
         doc_numbers = []
-        for line in text_content.split('\n'):
-            line = line.strip()
-            if line and len(line) > 3:
-                doc_num = extract_document_number(line)
-                if doc_num and len(doc_num) >= 4:  # Reasonable document number length
-                    doc_numbers.append({
-                        'number': doc_num,
-                        'context': line[:100]
-                    })
+        for match in _DOC_NUM_LINE_RE.finditer(text_content):
+            doc_numbers.append({
+                'number': match.group('number'),
+                'context': match.group('line').strip()[:100]
+            })
+            if len(doc_numbers) >= 10:
+                break
 
         return {
             'total_length': len(text_content),
-            'line_count': len(text_content.split('\n')),
+            'line_count': text_content.count('\n') + 1,
             'keyword_counts': keywords,
             'target_type_matches': target_matches,
-            'potential_doc_numbers': doc_numbers[:10],  # First 10
+            'potential_doc_numbers': doc_numbers,
             'has_error_messages': any(term in text_lower for term in
                                     ['erro', 'error', 'não encontrado', 'not found', 'nenhum resultado'])
         }
 
-    def _analyze_tables(self, soup: BeautifulSoup) -> List[Dict]:
+    def _analyze_tables(self, tables: List) -> List[Dict]:
         """Analyze all tables for document data"""
-        tables = soup.find_all('table')
         table_analyses = []
 
         for i, table in enumerate(tables):
@@ -144,7 +185,9 @@ class HTMLAnalyzer:
 
             # Check for document patterns in table
             potential_docs = []
-            for row in data_rows[:10]:  # Check first 10 rows
+            # Rows can only match if the table text does - skip the row walk otherwise
+            target_rows = data_rows[:10] if TARGET_DOC_TYPE.lower() in table_text else []
+            for row in target_rows:  # Check first 10 rows
                 row_text = row.get_text()
                 if TARGET_DOC_TYPE.lower() in row_text.lower():
                     cells = [cell.get_text().strip() for cell in row.find_all(['td', 'th'])]
@@ -201,9 +244,8 @@ class HTMLAnalyzer:
 
         return form_analyses
 
-    def _analyze_links(self, soup: BeautifulSoup) -> Dict:
+    def _analyze_links(self, links: List) -> Dict:
         """Analyze links for PDF and detail page patterns"""
-        links = soup.find_all('a')
 
         # Categorize links
         pdf_links = []
@@ -233,12 +275,15 @@ class HTMLAnalyzer:
             'external_links': len([l for l in links if l.get('href', '').startswith('http')])
         }
 
-    def _find_document_patterns(self, soup: BeautifulSoup) -> Dict:
+    def _find_document_patterns(self, soup: BeautifulSoup, text_content: str, text_lower: str) -> Dict:
         """Find patterns that could indicate document data"""
         patterns_found = {}
 
         # Pattern 1: Elements containing target document type
-        target_elements = soup.find_all(string=lambda x: x and TARGET_DOC_TYPE.lower() in x.lower())
+        # (only scan text nodes when the page text contains it at all)
+        target_elements = []
+        if TARGET_DOC_TYPE.lower() in text_lower:
+            target_elements = soup.find_all(string=lambda x: x and TARGET_DOC_TYPE.lower() in x.lower())
         if target_elements:
             patterns_found['target_type_elements'] = []
             for elem in target_elements[:5]:
@@ -255,19 +300,18 @@ class HTMLAnalyzer:
                     pass
 
         # Pattern 2: Numeric patterns that could be document numbers
-        text_content = soup.get_text()
-        number_patterns = re.findall(r'\b\d{4,10}\b', text_content)
+        number_patterns = _NUM_RE.findall(text_content)
         if number_patterns:
             patterns_found['potential_doc_numbers'] = list(set(number_patterns))[:10]
 
         # Pattern 3: Date patterns
-        date_patterns = re.findall(r'\b\d{1,2}/\d{1,2}/\d{4}\b', text_content)
+        date_patterns = _DATE_RE.findall(text_content)
         if date_patterns:
             patterns_found['date_patterns'] = list(set(date_patterns))[:5]
 
         # Pattern 4: Elements with specific classes or IDs that might contain documents
         doc_containers = soup.find_all(['div', 'span', 'td'],
-                                     class_=re.compile(r'doc|cert|result', re.I))
+                                     class_=_DOC_CONTAINER_CLASS_RE)
         if doc_containers:
             patterns_found['potential_containers'] = []
             for container in doc_containers[:3]:
@@ -280,28 +324,26 @@ class HTMLAnalyzer:
 
         return patterns_found
 
-    def _suggest_fixes(self, soup: BeautifulSoup) -> List[str]:
+    def _suggest_fixes(self, text_content: str, text_lower: str, tables: List) -> List[str]:
         """Suggest potential fixes based on analysis"""
         suggestions = []
 
         # Check if page has content at all
-        text_content = soup.get_text().strip()
-        if len(text_content) < 100:
+        if len(text_content.strip()) < 100:
             suggestions.append("Page has very little content - check if page loaded correctly")
 
         # Check for error messages
-        if any(term in text_content.lower() for term in ['erro', 'error', 'não encontrado']):
+        if any(term in text_lower for term in ['erro', 'error', 'não encontrado']):
             suggestions.append("Page contains error messages - check URL parameters or search terms")
 
         # Check for CADRI mentions
-        cadri_count = text_content.lower().count('cadri')
+        cadri_count = text_lower.count('cadri')
         if cadri_count == 0:
             suggestions.append("No CADRI mentions found - this might not be a document page")
         elif cadri_count > 0:
             suggestions.append(f"Found {cadri_count} CADRI mentions - page likely contains relevant data")
 
         # Check table structure
-        tables = soup.find_all('table')
         if not tables:
             suggestions.append("No tables found - documents might be in different HTML structure")
         else:
@@ -311,11 +353,11 @@ class HTMLAnalyzer:
                     suggestions.append(f"Table {i+1} has no headers - might need different parsing approach")
 
         # Check for target document type
-        if TARGET_DOC_TYPE.lower() not in text_content.lower():
+        if TARGET_DOC_TYPE.lower() not in text_lower:
             suggestions.append(f"Target document type '{TARGET_DOC_TYPE}' not found - check filter criteria")
 
         # Check for potential document numbers
-        doc_numbers = re.findall(r'\b\d{4,}\b', text_content)
+        doc_numbers = _LONG_NUM_RE.findall(text_content)
         if not doc_numbers:
             suggestions.append("No potential document numbers found")
         elif len(doc_numbers) > 10:
@@ -379,8 +421,15 @@ class HTMLAnalyzer:
             for suggestion in suggestions:
                 print(f"  - {suggestion}")
 
-    def batch_analyze(self, html_dir: Path) -> Dict:
-        """Analyze all HTML files in a directory"""
+    def batch_analyze(self, html_dir: Path, workers: Optional[int] = None) -> Dict:
+        """
+        Analyze all HTML files in a directory
+
+        Files are analyzed in a process pool (``workers`` processes, default
+        one per CPU). Per-file analyses are streamed to
+        batch_analysis_report.json; only the summary counters are kept in
+        memory and returned.
+        """
         html_files = list(html_dir.glob("*.html"))
 
         if not html_files:
@@ -389,45 +438,61 @@ class HTMLAnalyzer:
 
         logger.info(f"Analyzing {len(html_files)} HTML files in {html_dir}")
 
-        batch_results = {
-            'summary': {
-                'total_files': len(html_files),
-                'analyzed': 0,
-                'with_cadri_content': 0,
-                'with_documents': 0,
-                'with_errors': 0
-            },
-            'files': []
+        summary = {
+            'total_files': len(html_files),
+            'analyzed': 0,
+            'with_cadri_content': 0,
+            'with_documents': 0,
+            'with_errors': 0
         }
 
-        for html_file in html_files:
-            try:
-                analysis = self.analyze_file(html_file)
-                batch_results['files'].append(analysis)
-                batch_results['summary']['analyzed'] += 1
+        # Stream each analysis straight to disk so memory stays flat
+        batch_report_file = html_dir / "batch_analysis_report.json"
+        with open(batch_report_file, 'wb') as f, ProcessPoolExecutor(
+            max_workers=workers, mp_context=worker_mp_context(), initializer=init_worker_logging
+        ) as executor:
+            f.write(b'{"files": [')
+
+            for analysis in executor.map(analyze_file_standalone, html_files, chunksize=8):
+                if analysis is None:
+                    continue
+
+                if summary['analyzed']:
+                    f.write(b',')
+                f.write(_dumps(analysis))
+                summary['analyzed'] += 1
 
                 # Update counters
                 if analysis['text_analysis']['keyword_counts']['cadri'] > 0:
-                    batch_results['summary']['with_cadri_content'] += 1
+                    summary['with_cadri_content'] += 1
 
                 total_docs = sum(len(table['potential_documents']) for table in analysis['table_analysis'])
                 if total_docs > 0:
-                    batch_results['summary']['with_documents'] += 1
+                    summary['with_documents'] += 1
 
                 if analysis['text_analysis']['has_error_messages']:
-                    batch_results['summary']['with_errors'] += 1
-
-            except Exception as e:
-                logger.error(f"Error analyzing {html_file}: {e}")
-                continue
+                    summary['with_errors'] += 1
 
-        # Save batch report
-        batch_report_file = html_dir / "batch_analysis_report.json"
-        with open(batch_report_file, 'w', encoding='utf-8') as f:
-            json.dump(batch_results, f, indent=2, ensure_ascii=False, default=str)
+            f.write(b'], "summary": ')
+            f.write(_dumps(summary))
+            f.write(b'}')
 
         logger.info(f"Batch analysis complete. Report saved: {batch_report_file}")
-        return batch_results
+        return {'summary': summary, 'report_file': batch_report_file}
+
+
+def analyze_file_standalone(html_file: Path) -> Optional[Dict]:
+    """
+    Analyze a single HTML file outside of an HTMLAnalyzer instance
+
+    Module-level so it can be pickled into worker processes. Returns None
+    (after logging) if the file could not be analyzed.
+    """
+    try:
+        return HTMLAnalyzer().analyze_file(html_file)
+    except Exception as e:
+        logger.error(f"Error analyzing {html_file}: {e}")
+        return None
 
 
 def main():
@@ -437,6 +502,7 @@ def main():
     parser = argparse.ArgumentParser(description="Analyze HTML files for CADRI extraction debugging")
     parser.add_argument('--file', help='Single HTML file to analyze')
     parser.add_argument('--dir', help='Directory containing HTML files to analyze')
+    parser.add_argument('--workers', type=int, help='Worker processes for --dir (default: CPU count)')
 
     args = parser.parse_args()
 
@@ -452,7 +518,7 @@ def main():
     elif args.dir:
         html_dir = Path(args.dir)
         if html_dir.exists():
-            analyzer.batch_analyze(html_dir)
+            analyzer.batch_analyze(html_dir, workers=args.workers)
         else:
             print(f"Directory not found: {html_dir}")
 
@@ -7,16 +7,105 @@ de documentos CADRI, com base na análise de páginas reais.
 """
 
 import re
-from typing import List, Dict, Optional, Tuple
-from bs4 import BeautifulSoup, Tag
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Dict, Optional, Tuple, Union
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 from dataclasses import dataclass
+from lxml import etree
+import lxml.html
+
+# selectolax is optional - Lexbor-based backend for very large pages
+try:
+    from selectolax.lexbor import LexborHTMLParser, LexborNode
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+    LexborHTMLParser = LexborNode = None
+
+# pyahocorasick is optional - one automaton pass finds any type variation
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
 
 from utils_text import extract_document_number, parse_date_br, normalize_text
 from config import TARGET_DOC_TYPE, BASE_URL_AUTENTICIDADE
-from logging_conf import logger
+from logging_conf import logger, init_worker_logging, worker_mp_context
+
+
+# Precompiled XPath navigation for the lxml fast path
+XP_TABLE = etree.XPath('.//table')
+XP_TR = etree.XPath('.//tr')
+XP_TH = etree.XPath('.//th')
+XP_TD_TH = etree.XPath('.//td|.//th')
+XP_DIV = etree.XPath('.//div')
+XP_P = etree.XPath('.//p')
+XP_LI = etree.XPath('.//li')
+XP_FORM = etree.XPath('.//form')
+XP_IN_TABLE = etree.XPath('boolean(ancestor::table)')
+XP_HREF = etree.XPath('.//a/@href')
+XP_PARENT_HREF = etree.XPath('..//a/@href')
+
+# Authenticity-portal PDF link; only the document number varies
+_PDF_URL_PREFIX = f"{BASE_URL_AUTENTICIDADE}/autentica.php?idocmn=12&ndocmn="
+
+
+def _pdf_url(numero_documento: str) -> str:
+    return _PDF_URL_PREFIX + numero_documento
+
+
+def _build_automaton(words: List[str]):
+    """Aho-Corasick automaton over lowercased words, each mapped to itself"""
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word.lower(), word)
+    automaton.make_automaton()
+    return automaton
+
+
+# Reduced BS4 tree with only the tags the extractors look at (no head,
+# scripts, styles or layout chrome). <form> stays for the page analysis.
+DOCUMENT_STRAINER = SoupStrainer(['table', 'tr', 'td', 'th', 'div', 'p', 'li', 'a', 'form'])
+
+# One pass over the (lowercased) page text for the structure counters. The
+# tokens never overlap each other, so counts equal separate str.count calls.
+_ANALYSIS_RE = re.compile(r'(?P<cadri>cadri)|(?P<resid>resid)|(?P<cert>cert)|(?P<num>\b\d{4,10}\b)')
+
+# Element from any backend: BeautifulSoup Tag, lxml HtmlElement or selectolax LexborNode
+Node = Union[Tag, lxml.html.HtmlElement, 'LexborNode']
+
+
+@dataclass(slots=True)
+class DocRecord:
+    """CADRI document found on a page (converted to a dict at the API boundary)"""
+    numero_documento: str = ''
+    tipo_documento: str = ''
+    data_emissao: str = ''
+    url_detalhe: str = ''
+    url_pdf: str = ''
+    status_pdf: str = 'pending'
+    cnpj: str = ''
+    razao_social: str = ''
+    extraction_method: str = ''
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            'numero_documento': self.numero_documento,
+            'tipo_documento': self.tipo_documento,
+            'data_emissao': self.data_emissao,
+            'url_detalhe': self.url_detalhe,
+            'url_pdf': self.url_pdf,
+            'status_pdf': self.status_pdf,
+            'cnpj': self.cnpj,
+            'razao_social': self.razao_social,
+            'extraction_method': self.extraction_method
+        }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DocumentPattern:
     """Pattern for detecting documents"""
     name: str
@@ -40,19 +129,30 @@ class ImprovedDocumentExtractor:
         "CERTIFICADO RESIDUOS"
     ]
 
+    # Single case-insensitive alternation over all variations, matched once per text
+    _DOC_TYPE_RE = re.compile('|'.join(re.escape(var) for var in DOCUMENT_TYPE_VARIATIONS), re.IGNORECASE)
+    _DOC_TYPE_AUTOMATON = _build_automaton(DOCUMENT_TYPE_VARIATIONS) if AHOCORASICK_AVAILABLE else None
+
+    # Palavras-chave de cabeçalho para cada coluna de tabela padrão
+    COLUMN_KEYWORDS = {
+        'doc': ['numero', 'número', 'n°', 'document'],
+        'type': ['tipo', 'type', 'categoria'],
+        'date': ['data', 'date', 'emissao', 'emissão'],
+    }
+
     # Padrões de tabela comuns
     TABLE_PATTERNS = [
         DocumentPattern(
             name="standard_table",
             description="Table with Documento/Tipo headers",
-            selector="table:has(th:contains('documento'), th:contains('tipo'))",
+            selector="table:has(th:-soup-contains('documento'), th:-soup-contains('tipo'))",
             confidence=0.9,
             extractor_func="extract_from_standard_table"
         ),
         DocumentPattern(
             name="headerless_table",
             description="Table without headers but with document content",
-            selector="table:contains('CADRI')",
+            selector="table:-soup-contains('CADRI')",
             confidence=0.7,
             extractor_func="extract_from_headerless_table"
         ),
@@ -70,52 +170,238 @@ class ImprovedDocumentExtractor:
         DocumentPattern(
             name="div_list",
             description="Divs containing document information",
-            selector="div:contains('CADRI')",
+            selector="div:-soup-contains('CADRI')",
             confidence=0.5,
             extractor_func="extract_from_div"
         ),
         DocumentPattern(
             name="paragraph_list",
             description="Paragraphs with document info",
-            selector="p:contains('CERT')",
+            selector="p:-soup-contains('CERT')",
             confidence=0.4,
             extractor_func="extract_from_paragraph"
         ),
         DocumentPattern(
             name="list_items",
             description="List items with documents",
-            selector="li:contains('CADRI')",
+            selector="li:-soup-contains('CADRI')",
             confidence=0.6,
             extractor_func="extract_from_list_item"
         )
     ]
 
-    def __init__(self, soup: BeautifulSoup, company_info: Dict):
-        self.soup = soup
+    def __init__(self, soup: Optional[BeautifulSoup], company_info: Dict,
+                 html: Optional[Union[str, bytes]] = None, backend: str = 'lxml'):
+        """
+        Args:
+            soup: Parsed page (BeautifulSoup backend)
+            company_info: Company data copied into each document
+            html: Raw page HTML; when given, extraction runs on a fast tree
+                built from it instead of soup. If it cannot be parsed, soup
+                is used, or a strained BS4 tree (DOCUMENT_STRAINER) is built
+                when no soup was passed
+            backend: Fast tree for html - 'lxml' (precompiled XPath) or
+                'selectolax' (Lexbor, falls back to lxml if not installed)
+        """
         self.company_info = company_info
-        self.page_text = soup.get_text().lower()
+        self.backend = 'bs4'
+        self.tree = None
+
+        if html is not None:
+            if backend == 'selectolax' and not SELECTOLAX_AVAILABLE:
+                logger.debug("selectolax not installed, using lxml backend")
+                backend = 'lxml'
+
+            try:
+                if backend == 'selectolax':
+                    self.tree = LexborHTMLParser(html).root
+                else:
+                    # Always rooted at <html>: fromstring would return a lone
+                    # fragment root itself, which .//tag XPaths never match
+                    self.tree = lxml.html.document_fromstring(html)
+                self.backend = backend
+            except (etree.ParserError, ValueError) as e:
+                logger.debug(f"{backend} could not parse page, using BeautifulSoup: {e}")
+
+            if self.tree is None and soup is None:
+                soup = BeautifulSoup(html, 'lxml', parse_only=DOCUMENT_STRAINER)
+
+        self.soup = soup
+        self.page_text = self._text(self.tree if self.tree is not None else soup).lower()
+        self._tables = self._find_all('table')
+
+    @classmethod
+    def from_html(cls, html: Union[str, bytes], company_info: Dict,
+                  backend: str = 'lxml') -> 'ImprovedDocumentExtractor':
+        """Build an extractor straight from raw HTML, skipping BeautifulSoup"""
+        return cls(None, company_info, html=html, backend=backend)
+
+    # Backend helpers - every extractor navigates through these
+
+    def _text(self, element: Node) -> str:
+        """Text content of an element (same semantics as BS4 get_text())"""
+        if isinstance(element, etree._Element):
+            return element.text_content()
+        if self.backend == 'selectolax':
+            return element.text(deep=True, separator='')
+        return element.get_text()
+
+    def _string(self, element: Node) -> Optional[str]:
+        """
+        The element's only string, following single-child chains (same
+        semantics as BS4 .string, which find_all(string=...) matches)
+        """
+        while True:
+            if isinstance(element, etree._Element):
+                children = [element.text] if element.text else []
+                for child in element:
+                    children.append(child)
+                    if child.tail:
+                        children.append(child.tail)
+            elif self.backend == 'selectolax':
+                children = list(element.iter(include_text=True))
+            else:
+                return element.string
+
+            if len(children) != 1:
+                return None
+
+            element = children[0]
+            if isinstance(element, str):
+                return element
+            if self.backend == 'selectolax' and element.tag == '-text':
+                return element.text_content
+
+    def _find_doc_type(self, text: str) -> Optional[str]:
+        """First document type variation found in text (case-insensitive), if any"""
+        if self._DOC_TYPE_AUTOMATON is not None:
+            for _, variation in self._DOC_TYPE_AUTOMATON.iter(text.lower()):
+                return variation
+            return None
+
+        match = self._DOC_TYPE_RE.search(text)
+        return match.group(0) if match else None
+
+    def _find_all(self, name: str) -> List[Node]:
+        """All elements with a tag name in the page"""
+        if self.backend == 'lxml':
+            xpath = {'table': XP_TABLE, 'div': XP_DIV, 'p': XP_P, 'li': XP_LI, 'form': XP_FORM}[name]
+            return xpath(self.tree)
+        if self.backend == 'selectolax':
+            return self.tree.css(name)
+        return self.soup.find_all(name)
+
+    def _rows(self, table: Node) -> List[Node]:
+        if isinstance(table, etree._Element):
+            return XP_TR(table)
+        if self.backend == 'selectolax':
+            return table.css('tr')
+        return table.find_all('tr')
+
+    def _headers(self, table: Node) -> List[Node]:
+        if isinstance(table, etree._Element):
+            return XP_TH(table)
+        if self.backend == 'selectolax':
+            return table.css('th')
+        return table.find_all('th')
+
+    def _cells(self, row: Node) -> List[Node]:
+        if isinstance(row, etree._Element):
+            return XP_TD_TH(row)
+        if self.backend == 'selectolax':
+            return row.css('td, th')
+        return row.find_all(['td', 'th'])
+
+    def _node_key(self, element: Node) -> int:
+        """Stable identity for an element (selectolax builds a new wrapper per lookup)"""
+        if self.backend == 'selectolax':
+            return element.mem_id
+        return id(element)
+
+    def _ancestor_tables(self, table: Node) -> List[Node]:
+        """Tables enclosing this table, innermost first"""
+        if isinstance(table, etree._Element):
+            return list(table.iterancestors('table'))
+        if self.backend == 'selectolax':
+            ancestors = []
+            parent = table.parent
+            while parent is not None:
+                if parent.tag == 'table':
+                    ancestors.append(parent)
+                parent = parent.parent
+            return ancestors
+        return table.find_parents('table')
+
+    def _is_nested(self, table: Node) -> bool:
+        """Whether a table sits inside another table"""
+        if isinstance(table, etree._Element):
+            return XP_IN_TABLE(table)
+        if self.backend == 'selectolax':
+            return bool(self._ancestor_tables(table))
+        return table.find_parent('table') is not None
+
+    def _link_href(self, element: Node) -> Optional[str]:
+        """href of the first link (with an href) inside the element"""
+        if isinstance(element, etree._Element):
+            hrefs = XP_HREF(element)
+            return hrefs[0] if hrefs else None
+        if self.backend == 'selectolax':
+            link = element.css_first('a[href]')
+            return link.attrs.get('href') if link is not None else None
+        link = element.find('a', href=True)
+        return link['href'] if link is not None else None
+
+    def _nearby_link_href(self, element: Node) -> Optional[str]:
+        """Link href inside the element, else inside its parent"""
+        if isinstance(element, etree._Element):
+            hrefs = XP_HREF(element) or XP_PARENT_HREF(element)
+            return hrefs[0] if hrefs else None
+        href = self._link_href(element)
+        if not href and element.parent is not None:
+            href = self._link_href(element.parent)
+        return href
 
     def extract_all_documents(self) -> List[Dict]:
         """Extract documents using all available patterns"""
+        # Documents are deduplicated by number as they are collected;
+        # the first pattern (in confidence order) to find a number wins
         all_documents = []
+        seen_numbers = set()
         extraction_log = []
 
+        def add_unique(docs: List[DocRecord]):
+            for doc in docs:
+                doc_number = doc.numero_documento
+                if doc_number and doc_number not in seen_numbers:
+                    seen_numbers.add(doc_number)
+                    all_documents.append(doc)
+
         # First, analyze page structure
         page_analysis = self._analyze_page_structure()
         logger.debug(f"Page analysis: {page_analysis}")
 
-        # Try table patterns first (higher confidence)
+        # Every extractor needs a document type variation, and each variation
+        # contains "cadri" or "cert" - without them no pattern can match
+        if not (page_analysis['cadri_mentions'] or page_analysis['cert_mentions']
+                or page_analysis['target_type_exact']):
+            logger.debug("No CADRI/certificate mentions on page, skipping extraction")
+            return []
+
+        # Try table patterns first (higher confidence), all in one walk over the tables
+        table_docs, table_failures = self._walk_tables()
         for pattern in self.TABLE_PATTERNS:
-            try:
-                docs = self._apply_pattern(pattern)
-                if docs:
-                    extraction_log.append(f"Pattern '{pattern.name}' found {len(docs)} documents")
-                    all_documents.extend(docs)
-                else:
-                    extraction_log.append(f"Pattern '{pattern.name}' found no documents")
-            except Exception as e:
+            if pattern.name in table_failures:
+                e = table_failures[pattern.name]
                 extraction_log.append(f"Pattern '{pattern.name}' failed: {e}")
                 logger.debug(f"Pattern {pattern.name} failed: {e}")
+                continue
+
+            docs = table_docs[pattern.name]
+            if docs:
+                extraction_log.append(f"Pattern '{pattern.name}' found {len(docs)} documents")
+                add_unique(docs)
+            else:
+                extraction_log.append(f"Pattern '{pattern.name}' found no documents")
 
         # If no documents found in tables, try non-table patterns
         if not all_documents:
@@ -126,39 +412,41 @@ class ImprovedDocumentExtractor:
                     docs = self._apply_pattern(pattern)
                     if docs:
                         extraction_log.append(f"Pattern '{pattern.name}' found {len(docs)} documents")
-                        all_documents.extend(docs)
+                        add_unique(docs)
                     else:
                         extraction_log.append(f"Pattern '{pattern.name}' found no documents")
                 except Exception as e:
                     extraction_log.append(f"Pattern '{pattern.name}' failed: {e}")
                     logger.debug(f"Pattern {pattern.name} failed: {e}")
 
-        # Remove duplicates based on document number
-        unique_documents = self._deduplicate_documents(all_documents)
-
         # Log extraction summary
-        logger.info(f"Extraction summary: {len(unique_documents)} unique documents found")
+        logger.info(f"Extraction summary: {len(all_documents)} unique documents found")
         for log_entry in extraction_log:
             logger.debug(log_entry)
 
-        return unique_documents
+        return [doc.to_dict() for doc in all_documents]
 
     def _analyze_page_structure(self) -> Dict:
         """Analyze page structure to guide extraction strategy"""
+        counts = {'cadri': 0, 'resid': 0, 'cert': 0, 'num': 0}
+        for match in _ANALYSIS_RE.finditer(self.page_text):
+            counts[match.lastgroup] += 1
+
         analysis = {
-            'has_tables': len(self.soup.find_all('table')) > 0,
-            'table_count': len(self.soup.find_all('table')),
-            'has_forms': len(self.soup.find_all('form')) > 0,
-            'cadri_mentions': self.page_text.count('cadri'),
-            'residuo_mentions': self.page_text.count('resid'),
-            'cert_mentions': self.page_text.count('cert'),
-            'target_type_exact': any(var.lower() in self.page_text for var in self.DOCUMENT_TYPE_VARIATIONS),
-            'potential_doc_numbers': len(re.findall(r'\b\d{4,10}\b', self.page_text))
+            'has_tables': len(self._tables) > 0,
+            'table_count': len(self._tables),
+            'has_forms': len(self._find_all('form')) > 0,
+            'cadri_mentions': counts['cadri'],
+            'residuo_mentions': counts['resid'],
+            'cert_mentions': counts['cert'],
+            # Variations overlap the counted tokens, so they get their own (short-circuiting) search
+            'target_type_exact': self._find_doc_type(self.page_text) is not None,
+            'potential_doc_numbers': counts['num']
         }
 
         return analysis
 
-    def _apply_pattern(self, pattern: DocumentPattern) -> List[Dict]:
+    def _apply_pattern(self, pattern: DocumentPattern) -> List[DocRecord]:
         """Apply a specific extraction pattern"""
         extractor_method = getattr(self, pattern.extractor_func, None)
         if not extractor_method:
@@ -167,326 +455,402 @@ class ImprovedDocumentExtractor:
 
         return extractor_method(pattern)
 
-    def extract_from_standard_table(self, pattern: DocumentPattern) -> List[Dict]:
-        """Extract from tables with standard headers"""
-        documents = []
-        tables = self.soup.find_all('table')
-
-        for table in tables:
-            headers = table.find_all('th')
-            header_texts = [h.get_text().strip().lower() for h in headers]
-
-            # Check if table has document-related headers
-            has_doc_header = any('documento' in header or 'tipo' in header for header in header_texts)
+    def _walk_tables(self) -> Tuple[Dict[str, List[DocRecord]], Dict[str, Exception]]:
+        """
+        Run every table pattern over the page's tables
+
+        The standard pattern (the most reliable) walks all tables first;
+        the headerless and nested patterns then skip each table it found
+        documents in, and any table nested inside one. Coverage is only
+        settled after the full walk, so a later standard failure (which
+        drops its documents) never leaves earlier tables unextracted.
+        Returns (documents per pattern name, failures per pattern name); a
+        pattern that fails is dropped for the whole page.
+        """
+        found = {pattern.name: [] for pattern in self.TABLE_PATTERNS}
+        failures = {}
+        covered_tables = set()
+
+        for table in self._tables:
+            try:
+                standard_docs = self._standard_table_docs(table, self._header_texts(table))
+            except Exception as e:
+                failures['standard_table'] = e
+                found['standard_table'] = []
+                covered_tables.clear()
+                break
+            if standard_docs:
+                found['standard_table'].extend(standard_docs)
+                covered_tables.add(self._node_key(table))
+
+        for table in self._tables:
+            if covered_tables and (self._node_key(table) in covered_tables or
+                                   any(self._node_key(t) in covered_tables for t in self._ancestor_tables(table))):
+                continue
+
+            table_text = self._text(table)
+
+            for name, extractor in (
+                ('headerless_table', lambda: self._headerless_table_docs(table, table_text)),
+                ('nested_table', lambda: self._nested_table_docs(table, table_text)),
+            ):
+                if name in failures:
+                    continue
+                try:
+                    found[name].extend(extractor())
+                except Exception as e:
+                    failures[name] = e
+                    found[name] = []
 
-            if has_doc_header:
-                logger.debug(f"Found table with document headers: {header_texts}")
+        return found, failures
 
-                # Determine column indices
-                doc_number_col = self._find_column_index(header_texts, ['numero', 'número', 'n°', 'document'])
-                type_col = self._find_column_index(header_texts, ['tipo', 'type', 'categoria'])
-                date_col = self._find_column_index(header_texts, ['data', 'date', 'emissao', 'emissão'])
+    def _header_texts(self, table: Node) -> List[str]:
+        return [self._text(h).strip().lower() for h in self._headers(table)]
 
-                rows = table.find_all('tr')[1:]  # Skip header
+    def extract_from_standard_table(self, pattern: DocumentPattern) -> List[DocRecord]:
+        """Extract from tables with standard headers"""
+        documents = []
+        for table in self._tables:
+            documents.extend(self._standard_table_docs(table, self._header_texts(table)))
+        return documents
 
-                for row in rows:
-                    doc = self._extract_from_table_row(row, doc_number_col, type_col, date_col)
-                    if doc:
-                        documents.append(doc)
+    def extract_from_headerless_table(self, pattern: DocumentPattern) -> List[DocRecord]:
+        """Extract from tables without clear headers"""
+        documents = []
+        for table in self._tables:
+            documents.extend(self._headerless_table_docs(table, self._text(table)))
+        return documents
 
+    def extract_from_nested_table(self, pattern: DocumentPattern) -> List[DocRecord]:
+        """Extract from nested table structures"""
+        documents = []
+        for table in self._tables:
+            documents.extend(self._nested_table_docs(table, self._text(table)))
         return documents
 
-    def extract_from_headerless_table(self, pattern: DocumentPattern) -> List[Dict]:
-        """Extract from tables without clear headers"""
+    def _standard_table_docs(self, table: Node, header_texts: List[str]) -> List[DocRecord]:
+        """Documents from one table with standard headers"""
         documents = []
-        tables = self.soup.find_all('table')
 
-        for table in tables:
-            table_text = table.get_text().lower()
+        # Check if table has document-related headers
+        has_doc_header = any('documento' in header or 'tipo' in header for header in header_texts)
 
-            # Check if table contains relevant content
-            if any(var.lower() in table_text for var in self.DOCUMENT_TYPE_VARIATIONS):
-                logger.debug("Found headerless table with document content")
+        if has_doc_header:
+            logger.debug(f"Found table with document headers: {header_texts}")
 
-                rows = table.find_all('tr')
+            # Determine column indices
+            columns = self._find_column_indices(header_texts)
+            doc_number_col, type_col, date_col = columns['doc'], columns['type'], columns['date']
 
-                for row in rows:
-                    row_text = row.get_text()
+            rows = self._rows(table)[1:]  # Skip header
+            extract_row = self._row_extractor(doc_number_col, type_col, date_col)
 
-                    # Check if row contains document type
-                    if any(var.lower() in row_text.lower() for var in self.DOCUMENT_TYPE_VARIATIONS):
-                        doc = self._extract_from_flexible_row(row)
-                        if doc:
-                            documents.append(doc)
+            for row in rows:
+                doc = extract_row(row)
+                if doc:
+                    documents.append(doc)
 
         return documents
 
-    def extract_from_nested_table(self, pattern: DocumentPattern) -> List[Dict]:
-        """Extract from nested table structures"""
+    def _headerless_table_docs(self, table: Node, table_text: str) -> List[DocRecord]:
+        """Documents from one table without clear headers"""
         documents = []
 
-        # Find tables inside other tables
-        outer_tables = self.soup.find_all('table')
-        for outer_table in outer_tables:
-            inner_tables = outer_table.find_all('table')
+        # Check if table contains relevant content
+        if self._find_doc_type(table_text):
+            logger.debug("Found headerless table with document content")
 
-            for inner_table in inner_tables:
-                table_text = inner_table.get_text().lower()
+            rows = self._rows(table)
 
-                if any(var.lower() in table_text for var in self.DOCUMENT_TYPE_VARIATIONS):
-                    logger.debug("Found nested table with document content")
+            for row in rows:
+                row_text = self._text(row)
 
-                    rows = inner_table.find_all('tr')
-                    for row in rows:
-                        doc = self._extract_from_flexible_row(row)
-                        if doc:
-                            documents.append(doc)
+                # Check if row contains document type
+                if self._find_doc_type(row_text):
+                    doc = self._extract_from_flexible_row(row, row_text)
+                    if doc:
+                        documents.append(doc)
 
         return documents
 
-    def extract_from_div(self, pattern: DocumentPattern) -> List[Dict]:
-        """Extract from div elements"""
+    def _nested_table_docs(self, table: Node, table_text: str) -> List[DocRecord]:
+        """Documents from one table that sits inside another table"""
         documents = []
 
-        # Find divs containing document information
-        for var in self.DOCUMENT_TYPE_VARIATIONS:
-            divs = self.soup.find_all('div', string=lambda x: x and var.lower() in x.lower())
+        if self._is_nested(table) and self._find_doc_type(table_text):
+            logger.debug("Found nested table with document content")
 
-            for div in divs:
-                doc = self._extract_from_element(div, 'div')
+            rows = self._rows(table)
+            for row in rows:
+                doc = self._extract_from_flexible_row(row, self._text(row))
                 if doc:
                     documents.append(doc)
 
         return documents
 
-    def extract_from_paragraph(self, pattern: DocumentPattern) -> List[Dict]:
+    def extract_from_div(self, pattern: DocumentPattern) -> List[DocRecord]:
+        """Extract from div elements"""
+        documents = []
+
+        # Find divs whose only string names a document type (BS4's string=)
+        if self.backend == 'bs4':
+            divs = self.soup.find_all('div', string=self._DOC_TYPE_RE)
+        else:
+            divs = [div for div in self._find_all('div')
+                    if (string := self._string(div)) and self._find_doc_type(string)]
+
+        for div in divs:
+            doc = self._extract_from_element(div, 'div', self._text(div))
+            if doc:
+                documents.append(doc)
+
+        return documents
+
+    def extract_from_paragraph(self, pattern: DocumentPattern) -> List[DocRecord]:
         """Extract from paragraph elements"""
         documents = []
 
-        paragraphs = self.soup.find_all('p')
+        paragraphs = self._find_all('p')
         for p in paragraphs:
-            p_text = p.get_text().lower()
+            p_text = self._text(p)
 
-            if any(var.lower() in p_text for var in self.DOCUMENT_TYPE_VARIATIONS):
-                doc = self._extract_from_element(p, 'paragraph')
+            if self._find_doc_type(p_text):
+                doc = self._extract_from_element(p, 'paragraph', p_text)
                 if doc:
                     documents.append(doc)
 
         return documents
 
-    def extract_from_list_item(self, pattern: DocumentPattern) -> List[Dict]:
+    def extract_from_list_item(self, pattern: DocumentPattern) -> List[DocRecord]:
         """Extract from list item elements"""
         documents = []
 
-        list_items = self.soup.find_all('li')
+        list_items = self._find_all('li')
         for li in list_items:
-            li_text = li.get_text().lower()
+            li_text = self._text(li)
 
-            if any(var.lower() in li_text for var in self.DOCUMENT_TYPE_VARIATIONS):
-                doc = self._extract_from_element(li, 'list_item')
+            if self._find_doc_type(li_text):
+                doc = self._extract_from_element(li, 'list_item', li_text)
                 if doc:
                     documents.append(doc)
 
         return documents
 
-    def _find_column_index(self, headers: List[str], keywords: List[str]) -> Optional[int]:
-        """Find column index for specific keywords"""
+    def _find_column_indices(self, headers: List[str]) -> Dict[str, Optional[int]]:
+        """Find the first column matching each role in COLUMN_KEYWORDS, in one pass over the headers"""
+        columns = {role: None for role in self.COLUMN_KEYWORDS}
         for i, header in enumerate(headers):
-            if any(keyword in header for keyword in keywords):
-                return i
-        return None
+            for role, keywords in self.COLUMN_KEYWORDS.items():
+                if columns[role] is None and any(keyword in header for keyword in keywords):
+                    columns[role] = i
+        return columns
 
-    def _extract_from_table_row(self, row: Tag, doc_col: int = None, type_col: int = None, date_col: int = None) -> Optional[Dict]:
+    def _extract_from_table_row(self, row: Node, doc_col: int = None, type_col: int = None, date_col: int = None) -> Optional[DocRecord]:
         """Extract document from table row with known column structure"""
-        cells = row.find_all(['td', 'th'])
+        cells = self._cells(row)
 
         if len(cells) < 2:
             return None
 
-        doc_info = {
-            'numero_documento': '',
-            'tipo_documento': '',
-            'data_emissao': '',
-            'url_detalhe': '',
-            'url_pdf': '',
-            'status_pdf': 'pending',
-            'cnpj': self.company_info.get('cnpj', ''),
-            'razao_social': self.company_info.get('razao_social', ''),
-            'extraction_method': 'structured_table'
-        }
+        doc_info = DocRecord(
+            cnpj=self.company_info.get('cnpj', ''),
+            razao_social=self.company_info.get('razao_social', ''),
+            extraction_method='structured_table'
+        )
 
         # Extract based on column positions
         if doc_col is not None and doc_col < len(cells):
-            doc_num = extract_document_number(cells[doc_col].get_text())
+            doc_num = extract_document_number(self._text(cells[doc_col]))
             if doc_num:
-                doc_info['numero_documento'] = doc_num
+                doc_info.numero_documento = doc_num
 
         if type_col is not None and type_col < len(cells):
-            type_text = cells[type_col].get_text().strip()
-            if any(var.lower() in type_text.lower() for var in self.DOCUMENT_TYPE_VARIATIONS):
-                doc_info['tipo_documento'] = self._normalize_document_type(type_text)
+            type_text = self._text(cells[type_col]).strip()
+            if self._find_doc_type(type_text):
+                doc_info.tipo_documento = self._normalize_document_type(type_text)
 
         if date_col is not None and date_col < len(cells):
-            date = parse_date_br(cells[date_col].get_text())
+            date = parse_date_br(self._text(cells[date_col]))
             if date:
-                doc_info['data_emissao'] = date
-
+                doc_info.data_emissao = date
+
+        return self._complete_table_row(row, doc_info)
+
+    def _row_extractor(self, doc_col: Optional[int], type_col: Optional[int],
+                       date_col: Optional[int]) -> Callable[[Node], Optional[DocRecord]]:
+        """
+        Row extractor specialized for one table's column layout
+
+        When all three columns are known, rows wide enough to hold them are
+        read by direct indexing with no per-column checks; other rows and
+        partial layouts go through _extract_from_table_row.
+        """
+        if doc_col is None or type_col is None or date_col is None:
+            return lambda row: self._extract_from_table_row(row, doc_col, type_col, date_col)
+
+        width = max(doc_col, type_col, date_col, 1) + 1
+        cnpj = self.company_info.get('cnpj', '')
+        razao_social = self.company_info.get('razao_social', '')
+        text, cells_of, find_doc_type = self._text, self._cells, self._find_doc_type
+
+        def fast_row(row: Node) -> Optional[DocRecord]:
+            cells = cells_of(row)
+            if len(cells) < width:
+                return self._extract_from_table_row(row, doc_col, type_col, date_col)
+
+            doc_info = DocRecord(
+                numero_documento=extract_document_number(text(cells[doc_col])) or '',
+                # Any variation normalizes to the target type
+                tipo_documento=TARGET_DOC_TYPE if find_doc_type(text(cells[type_col])) else '',
+                data_emissao=parse_date_br(text(cells[date_col])) or '',
+                cnpj=cnpj,
+                razao_social=razao_social,
+                extraction_method='structured_table'
+            )
+            return self._complete_table_row(row, doc_info)
+
+        return fast_row
+
+    def _complete_table_row(self, row: Node, doc_info: DocRecord) -> Optional[DocRecord]:
+        """Fill gaps from flexible extraction and keep the row only if it has number and type"""
         # If structure-based extraction failed, try flexible extraction
-        if not doc_info['numero_documento'] or not doc_info['tipo_documento']:
+        if not doc_info.numero_documento or not doc_info.tipo_documento:
             flexible_doc = self._extract_from_flexible_row(row)
             if flexible_doc:
                 # Merge results, preferring structured when available
-                for key, value in flexible_doc.items():
-                    if not doc_info.get(key) and value:
-                        doc_info[key] = value
+                for key in DocRecord.__slots__:
+                    value = getattr(flexible_doc, key)
+                    if not getattr(doc_info, key) and value:
+                        setattr(doc_info, key, value)
 
         # Only return if we have at least document number and type
-        if doc_info['numero_documento'] and doc_info['tipo_documento']:
+        if doc_info.numero_documento and doc_info.tipo_documento:
             # Generate PDF URL
-            doc_info['url_pdf'] = f"{BASE_URL_AUTENTICIDADE}/autentica.php?idocmn=12&ndocmn={doc_info['numero_documento']}"
+            doc_info.url_pdf = _pdf_url(doc_info.numero_documento)
             return doc_info
 
         return None
 
-    def _extract_from_flexible_row(self, row: Tag) -> Optional[Dict]:
-        """Extract document from row without knowing structure"""
-        row_text = row.get_text()
-        cells = row.find_all(['td', 'th'])
-
-        doc_info = {
-            'numero_documento': '',
-            'tipo_documento': '',
-            'data_emissao': '',
-            'url_detalhe': '',
-            'url_pdf': '',
-            'status_pdf': 'pending',
-            'cnpj': self.company_info.get('cnpj', ''),
-            'razao_social': self.company_info.get('razao_social', ''),
-            'extraction_method': 'flexible_row'
-        }
+    def _extract_from_flexible_row(self, row: Node, row_text: Optional[str] = None) -> Optional[DocRecord]:
+        """
+        Extract document from row without knowing structure
 
-        # Check if row contains document type
-        doc_type_found = False
-        for var in self.DOCUMENT_TYPE_VARIATIONS:
-            if var.lower() in row_text.lower():
-                doc_info['tipo_documento'] = self._normalize_document_type(var)
-                doc_type_found = True
-                break
+        Callers that already walked the row pass its text as row_text so
+        the subtree is not walked again.
+        """
+        if row_text is None:
+            row_text = self._text(row)
+
+        doc_info = DocRecord(
+            cnpj=self.company_info.get('cnpj', ''),
+            razao_social=self.company_info.get('razao_social', ''),
+            extraction_method='flexible_row'
+        )
 
-        if not doc_type_found:
+        # Check if row contains document type
+        type_match = self._find_doc_type(row_text)
+        if not type_match:
             return None
+        doc_info.tipo_documento = self._normalize_document_type(type_match)
 
         # Extract document number
         doc_num = extract_document_number(row_text)
         if doc_num:
-            doc_info['numero_documento'] = doc_num
+            doc_info.numero_documento = doc_num
         else:
             return None
 
         # Extract date
         date = parse_date_br(row_text)
         if date:
-            doc_info['data_emissao'] = date
+            doc_info.data_emissao = date
 
         # Look for links
-        link = row.find('a')
-        if link and link.get('href'):
-            doc_info['url_detalhe'] = link['href']
+        href = self._link_href(row)
+        if href:
+            doc_info.url_detalhe = href
 
         # Generate PDF URL
-        doc_info['url_pdf'] = f"{BASE_URL_AUTENTICIDADE}/autentica.php?idocmn=12&ndocmn={doc_info['numero_documento']}"
+        doc_info.url_pdf = _pdf_url(doc_info.numero_documento)
 
         return doc_info
 
-    def _extract_from_element(self, element: Tag, element_type: str) -> Optional[Dict]:
-        """Extract document from generic element"""
-        element_text = element.get_text()
-
-        doc_info = {
-            'numero_documento': '',
-            'tipo_documento': '',
-            'data_emissao': '',
-            'url_detalhe': '',
-            'url_pdf': '',
-            'status_pdf': 'pending',
-            'cnpj': self.company_info.get('cnpj', ''),
-            'razao_social': self.company_info.get('razao_social', ''),
-            'extraction_method': f'element_{element_type}'
-        }
+    def _extract_from_element(self, element: Node, element_type: str,
+                              element_text: Optional[str] = None) -> Optional[DocRecord]:
+        """Extract document from generic element (element_text: precomputed text, if any)"""
+        if element_text is None:
+            element_text = self._text(element)
 
-        # Check for document type
-        doc_type_found = False
-        for var in self.DOCUMENT_TYPE_VARIATIONS:
-            if var.lower() in element_text.lower():
-                doc_info['tipo_documento'] = self._normalize_document_type(var)
-                doc_type_found = True
-                break
+        doc_info = DocRecord(
+            cnpj=self.company_info.get('cnpj', ''),
+            razao_social=self.company_info.get('razao_social', ''),
+            extraction_method=f'element_{element_type}'
+        )
 
-        if not doc_type_found:
+        # Check for document type
+        type_match = self._find_doc_type(element_text)
+        if not type_match:
             return None
+        doc_info.tipo_documento = self._normalize_document_type(type_match)
 
         # Extract document number
         doc_num = extract_document_number(element_text)
         if doc_num:
-            doc_info['numero_documento'] = doc_num
+            doc_info.numero_documento = doc_num
         else:
             return None
 
         # Extract date
         date = parse_date_br(element_text)
         if date:
-            doc_info['data_emissao'] = date
+            doc_info.data_emissao = date
 
         # Look for links in element or parent
-        link = element.find('a') or (element.parent.find('a') if element.parent else None)
-        if link and link.get('href'):
-            doc_info['url_detalhe'] = link['href']
+        href = self._nearby_link_href(element)
+        if href:
+            doc_info.url_detalhe = href
 
         # Generate PDF URL
-        doc_info['url_pdf'] = f"{BASE_URL_AUTENTICIDADE}/autentica.php?idocmn=12&ndocmn={doc_info['numero_documento']}"
+        doc_info.url_pdf = _pdf_url(doc_info.numero_documento)
 
         return doc_info
 
     def _normalize_document_type(self, type_text: str) -> str:
         """Normalize document type to standard format"""
-        type_text = type_text.strip().upper()
-
-        # Map variations to standard type
-        if any(var.upper() in type_text for var in self.DOCUMENT_TYPE_VARIATIONS):
+        # Map variations to standard type (the match is case-insensitive, so
+        # only unmatched text needs the uppercase copy)
+        if self._find_doc_type(type_text):
             return TARGET_DOC_TYPE
 
-        return type_text
-
-    def _deduplicate_documents(self, documents: List[Dict]) -> List[Dict]:
-        """Remove duplicate documents based on document number"""
-        seen_numbers = set()
-        unique_docs = []
-
-        for doc in documents:
-            doc_number = doc.get('numero_documento', '')
-            if doc_number and doc_number not in seen_numbers:
-                seen_numbers.add(doc_number)
-                unique_docs.append(doc)
-
-        return unique_docs
+        return type_text.strip().upper()
 
 
 # Integration function for existing scraper
-def extract_cadri_documents_improved(soup: BeautifulSoup, company_info: Dict) -> List[Dict]:
+def extract_cadri_documents_improved(soup: Optional[BeautifulSoup], company_info: Dict,
+                                     html: Optional[Union[str, bytes]] = None,
+                                     backend: str = 'lxml') -> List[Dict]:
     """
     Improved version of extract_cadri_documents using enhanced patterns
 
-    This function can replace the existing extract_cadri_documents method
+    This function can replace the existing extract_cadri_documents method.
+    Pass the raw ``html`` to run the extractors on a faster backend ('lxml'
+    or 'selectolax'); soup may then be None. A selectolax run that finds
+    nothing is retried on lxml. Callers building their own soup can pass
+    ``parse_only=DOCUMENT_STRAINER`` to keep the tree small.
     """
     try:
-        extractor = ImprovedDocumentExtractor(soup, company_info)
+        extractor = ImprovedDocumentExtractor(soup, company_info, html=html, backend=backend)
         documents = extractor.extract_all_documents()
 
+        if not documents and extractor.backend == 'selectolax':
+            logger.debug("selectolax backend found no documents, retrying with lxml")
+            extractor = ImprovedDocumentExtractor(soup, company_info, html=html, backend='lxml')
+            documents = extractor.extract_all_documents()
+
         logger.info(f"Enhanced extraction found {len(documents)} CADRI documents")
 
         # Log extraction methods used
-        methods = [doc.get('extraction_method', 'unknown') for doc in documents]
-        method_counts = {method: methods.count(method) for method in set(methods)}
+        method_counts = dict(Counter(doc.get('extraction_method', 'unknown') for doc in documents))
         logger.debug(f"Extraction methods used: {method_counts}")
 
         return documents
@@ -496,6 +860,33 @@ def extract_cadri_documents_improved(soup: BeautifulSoup, company_info: Dict) ->
         return []
 
 
+def _extract_page(html: Union[str, bytes], company_info: Dict) -> List[Dict]:
+    """Process-pool worker: parse one page and extract its documents"""
+    return extract_cadri_documents_improved(None, company_info, html=html)
+
+
+def extract_cadri_documents_batch(pages: Iterable[Tuple[Union[str, bytes], Dict]],
+                                  workers: Optional[int] = None) -> List[List[Dict]]:
+    """
+    Extract documents from many (html, company_info) pages in parallel
+
+    Each page is parsed and extracted in a process pool (``workers``
+    processes, default one per CPU); only the document dicts travel back.
+    Results are in the same order as ``pages``.
+    """
+    htmls, infos = [], []
+    for html, company_info in pages:
+        htmls.append(html)
+        infos.append(company_info)
+
+    if not htmls:
+        return []
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=worker_mp_context(),
+                             initializer=init_worker_logging) as executor:
+        return list(executor.map(_extract_page, htmls, infos, chunksize=8))
+
+
 def test_patterns():
     """Test the improved patterns with sample HTML"""
     sample_html = """
@@ -521,7 +912,7 @@ def test_patterns():
     </html>
     """
 
-    soup = BeautifulSoup(sample_html, 'html.parser')
+    soup = BeautifulSoup(sample_html, 'lxml')
     company_info = {'cnpj': '12345678000100', 'razao_social': 'Empresa Teste'}
 
     documents = extract_cadri_documents_improved(soup, company_info)
@@ -3,14 +3,23 @@
 LLM-based PDF Parser for CADRI documents using OpenRouter structured outputs
 """
 
+import os
 import sys
 import json
+import asyncio
+import contextlib
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import re
+import sqlite3
+import time
+import threading
+import httpx
+from functools import lru_cache
 
 # Add src to path for imports (matching pipeline pattern)
 sys.path.insert(0, str(Path(__file__).parent))
@@ -24,16 +33,166 @@ except ImportError:
     PYMUPDF_AVAILABLE = False
     fitz = None
 
+# orjson is optional - faster decoding of LLM responses and batch JSONL
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# pypdfium2 is optional - alternative text extraction backend (PDF_BACKEND=pdfium)
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+    pdfium = None
+
+# tiktoken is optional - truncates PDF text by tokens instead of characters
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    tiktoken = None
+
+# h2 is optional (httpx[http2]) - multiplexes concurrent LLM requests over one connection
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 from open_router_controller import OpenRouterController
+from pydantic import ValidationError
 from schemas import CADRIExtractionResult, ItemResiduoCADRI, flatten_item_to_dict
 from store_csv import CSVStore, CSVSchemas
 from logging_conf import logger
 from config import (
-    PDF_DIR, CSV_CADRI_ITEMS, LLM_DEFAULT_MODEL, LLM_MAX_TEXT_LENGTH,
-    LLM_TEMPERATURE, LLM_BATCH_SIZE, LLM_PARSER_ENABLED
+    PDF_DIR, CSV_CADRI_ITEMS, CSV_CADRI_ITEMS_STAGING, LLM_DEFAULT_MODEL, LLM_MAX_TEXT_LENGTH, LLM_MAX_TEXT_TOKENS,
+    LLM_TEMPERATURE, LLM_BATCH_SIZE, LLM_CONCURRENCY, LLM_DOCS_PER_REQUEST, LLM_PARSER_ENABLED,
+    OPENAI_API_KEY, LLM_BATCH_DIR, PDF_BACKEND, LLM_CACHE_FILE, LLM_JSON_SCHEMA
 )
 
 
+# Objeto JSON mais externo na resposta do LLM
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+def _loads(text: str):
+    """Parse JSON, using orjson when installed (stdlib json for what orjson rejects, e.g. NaN)"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def _dumps_line(obj) -> bytes:
+    """Serialize to one UTF-8 JSONL line, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+# Limite de caracteres por token usado para pré-cortar o texto antes de tokenizar
+_MAX_CHARS_PER_TOKEN = 8
+
+# Parsers de fallback, criados na primeira falha e reutilizados (Docling carrega modelos em segundos)
+_standalone_parser = None
+_docling_parser = None
+# Os fallbacks rodam em threads (asyncio.to_thread), então a criação é serializada
+_fallback_parsers_lock = threading.Lock()
+
+
+def _get_standalone_parser():
+    global _standalone_parser
+    with _fallback_parsers_lock:
+        if _standalone_parser is None:
+            from pdf_parser_standalone import PDFParserStandalone
+            _standalone_parser = PDFParserStandalone()
+    return _standalone_parser
+
+
+def _get_docling_parser():
+    """Instância única do DoclingPDFParser, ou None se o Docling não estiver instalado"""
+    global _docling_parser
+    with _fallback_parsers_lock:
+        if _docling_parser is None:
+            from docling_parser import DoclingPDFParser, DOCLING_AVAILABLE
+            if not DOCLING_AVAILABLE:
+                return None
+            _docling_parser = DoclingPDFParser()
+    return _docling_parser
+
+
+@lru_cache(maxsize=None)
+def _json_schema_format(multi: bool = False) -> Dict:
+    """response_format de structured output gerado de CADRIExtractionResult (calculado uma vez)"""
+    schema = CADRIExtractionResult.model_json_schema()
+    # Preenchidos localmente pelo schema pydantic; o LLM não precisa gerá-los
+    for field in ('extraction_method', 'processed_at'):
+        schema['properties'].pop(field, None)
+
+    name = "CADRIExtractionResult"
+    if multi:
+        defs = schema.pop('$defs', {})
+        schema = {
+            'type': 'object',
+            'properties': {'results': {'type': 'array', 'items': schema}},
+            'required': ['results'],
+            '$defs': defs,
+        }
+        name = "CADRIExtractionResults"
+
+    # strict exige todos os campos obrigatórios e additionalProperties=false, o que
+    # os campos opcionais do schema não atendem
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": False}}
+
+
+class LLMResponseCache:
+    """Cache persistente (SQLite) das respostas válidas do LLM, chaveado por SHA-256"""
+
+    def __init__(self, path: Path):
+        # O parser pode rodar o event loop em outra thread (_run_coroutine)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, response: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, datetime.now().isoformat())
+            )
+
+def _run_coroutine(coro):
+    """Roda a coroutine até o fim, inclusive quando chamada de dentro de um event loop (pipeline async)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
 class LLMPDFParser:
     """Parser de PDFs CADRI usando LLM com structured outputs e Docling para extração de texto"""
 
@@ -42,22 +201,30 @@ class LLMPDFParser:
         if not LLM_PARSER_ENABLED:
             raise ImportError("LLM parser is disabled. Set LLM_PARSER_ENABLED=true in environment.")
 
-        # Verificar se PyMuPDF está disponível
-        if not PYMUPDF_AVAILABLE:
-            raise ImportError("PyMuPDF is not available. Install with: pip install PyMuPDF")
+        # Verificar backend de extração de texto (PyMuPDF por padrão)
+        self.text_backend = self._select_text_backend()
 
         self.pdf_dir = PDF_DIR
         self.model = model or LLM_DEFAULT_MODEL
         self.max_text_length = LLM_MAX_TEXT_LENGTH
+        self.max_text_tokens = LLM_MAX_TEXT_TOKENS
+        self._encoding = None
+        self._encoding_loaded = False
         self.temperature = LLM_TEMPERATURE
         self.batch_size = LLM_BATCH_SIZE
+        self.concurrency = LLM_CONCURRENCY
+        self.docs_per_request = max(1, LLM_DOCS_PER_REQUEST)
+        self.json_schema = LLM_JSON_SCHEMA
 
         try:
             self.openrouter = OpenRouterController()
         except Exception as e:
             raise ImportError(f"Failed to initialize OpenRouterController: {e}")
 
+        # Itens de uma execução interrompida ainda no staging entram no CSV antes do cache
+        self._finalize_items()
         self.parsed_cache = self._load_parsed_cache()
+        self.response_cache = LLMResponseCache(LLM_CACHE_FILE)
         self.stats = {
             'processed': 0,
             'items_extracted': 0,
@@ -65,24 +232,49 @@ class LLMPDFParser:
             'llm_errors': 0,
             'fallback_used': 0,
             'cache_hits': 0,
-            'pymupdf_used': 0
+            'llm_cache_hits': 0,
+            'pymupdf_used': 0,
+            'pdfium_used': 0,
+            'tokens_sent': 0
         }
 
         # System prompt para structured output
         self.system_prompt = self._create_system_prompt()
 
-        logger.info(f"LLM Parser initialized with model: {self.model} and PyMuPDF text extraction")
+        logger.info(f"LLM Parser initialized with model: {self.model} and {self.text_backend} text extraction")
+
+    async def __aenter__(self):
+        """Abre um único cliente HTTP (keep-alive, HTTP/2 se disponível) reutilizado por toda a execução"""
+        self._http = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=60.0,
+        )
+        self._session = self.openrouter.async_session(http_client=self._http)
+        await self._session.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self._session.__aexit__(exc_type, exc, tb)
+        finally:
+            await self._http.aclose()
+            self._http = None
+            self._session = None
 
     def _load_parsed_cache(self) -> set:
         """Carrega cache de documentos já processados"""
         try:
+            # Só a coluna numero_documento é materializada
+            usecols = lambda col: col == 'numero_documento'
+
             # Tentar ler o CSV com tratamento de erros
             try:
-                df = pd.read_csv(CSV_CADRI_ITEMS, dtype=str, on_bad_lines='skip')
+                df = pd.read_csv(CSV_CADRI_ITEMS, dtype=str, usecols=usecols, on_bad_lines='skip')
             except Exception:
                 # Se falhar, tentar com engine python e tratamento de quotes
                 try:
-                    df = pd.read_csv(CSV_CADRI_ITEMS, dtype=str, engine='python',
+                    df = pd.read_csv(CSV_CADRI_ITEMS, dtype=str, usecols=usecols, engine='python',
                                    on_bad_lines='skip', quoting=3)  # QUOTE_NONE
                 except Exception as e:
                     logger.warning(f"Erro ao ler CSV cache, iniciando vazio: {e}")
@@ -98,12 +290,8 @@ class LLMPDFParser:
         return set()
 
     def _create_system_prompt(self) -> str:
-        """Cria o prompt de sistema para extração estruturada completa"""
-        return """Você é um especialista em extração completa de dados de documentos CADRI da CETESB.
-
-RETORNE APENAS JSON VÁLIDO, sem texto adicional antes ou depois.
-
-ESTRUTURA OBRIGATÓRIA:
+        """Cria o prompt de sistema; com json_schema a estrutura vai no response_format, não no texto"""
+        structure = "" if self.json_schema else """ESTRUTURA OBRIGATÓRIA:
 {
   "numero_documento": "número do documento",
   "total_items": número inteiro de itens encontrados,
@@ -186,17 +374,28 @@ CADA ITEM deve conter TODOS estes campos (use null se não encontrado):
     "tipo_documento": "CADRI" ou "Certificado"
   }
 
-INSTRUÇÕES ESPECÍFICAS DE BUSCA:
+FORMATO DE DATA/HORA:
+- Use formato: "YYYY-MM-DDTHH:MM:SS"
+- Exemplo: "2025-09-24T12:00:00"
+- Nunca use :: (duplo)
+
+"""
+
+        return """Você é um especialista em extração completa de dados de documentos CADRI da CETESB.
+
+RETORNE APENAS JSON VÁLIDO, sem texto adicional antes ou depois.
+
+""" + structure + """INSTRUÇÕES ESPECÍFICAS DE BUSCA:
 - Códigos de resíduo: Procure por padrões como "D099", "F001", "K001", "A021" precedidos por números de item
 - Acondicionamento: Busque códigos "E01", "E04", "E05" e suas descrições (Tambor, Tanque, Container)
 - Entidades: Procure seções "ENTIDADE GERADORA" e "ENTIDADE DE DESTINAÇÃO"
 - Classes: I (perigoso), IIA (não perigoso-não inerte), IIB (não perigoso-inerte)
 - Quantidades: Valores numéricos seguidos de unidades (t/ano, kg/ano, L, m³)
 
-FORMATO DE DATA/HORA:
-- Use formato: "YYYY-MM-DDTHH:MM:SS"
-- Exemplo: "2025-09-24T12:00:00"
-- Nunca use :: (duplo)
+MÚLTIPLOS DOCUMENTOS:
+- Se a mensagem trouxer vários blocos "=== DOC <numero> === ... === END DOC ===", retorne
+  {"results": [...]} com um objeto no formato de documento único para cada bloco
+- Nunca misture itens de documentos diferentes
 
 IMPORTANTE:
 - Extraia TODOS os campos listados
@@ -205,38 +404,123 @@ IMPORTANTE:
 - Mantenha dados originais sem modificações desnecessárias"""
 
 
-    def _extract_text_from_pdf(self, pdf_path: Path) -> str:
-        """Extrai texto completo do PDF usando PyMuPDF (método comprovado)"""
-        try:
-            logger.debug(f"Extraindo texto com PyMuPDF: {pdf_path}")
+    @staticmethod
+    def _select_text_backend() -> str:
+        """Escolhe o backend de texto conforme PDF_BACKEND (auto: PyMuPDF, senão pdfium)"""
+        available = {'pymupdf': PYMUPDF_AVAILABLE, 'pdfium': PDFIUM_AVAILABLE}
 
-            # Abrir PDF usando PyMuPDF (mesmo método do parser regex que funciona)
-            doc = fitz.open(str(pdf_path))
-            text_content = ""
+        if PDF_BACKEND in available:
+            if not available[PDF_BACKEND]:
+                raise ImportError(f"PDF_BACKEND={PDF_BACKEND} is not installed")
+            return PDF_BACKEND
 
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                page_text = page.get_text()
-                if page_text.strip():
-                    text_content += f"\n--- PÁGINA {page_num + 1} ---\n"
-                    text_content += page_text + "\n"
+        for backend, is_available in available.items():
+            if is_available:
+                return backend
 
-            doc.close()
-            self.stats['pymupdf_used'] += 1
+        raise ImportError("PyMuPDF is not available. Install with: pip install PyMuPDF")
 
-            logger.debug(f"PyMuPDF extraiu {len(text_content)} caracteres de {pdf_path.name}")
+    def _extract_text_from_pdf(self, pdf_path: Path) -> str:
+        """
+        Extrai o texto do PDF com o backend configurado (PyMuPDF por padrão)
+
+        As páginas são lidas uma a uma e a leitura para assim que o texto
+        passa do que cabe no prompt: o restante seria truncado de qualquer forma.
+        """
+        try:
+            logger.debug(f"Extraindo texto com {self.text_backend}: {pdf_path}")
+
+            budget = self._text_char_budget()
+            parts, length = [], 0
+            with contextlib.closing(self._iter_pages(pdf_path)) as pages:
+                for page_num, page_text in pages:
+                    if not page_text.strip():
+                        continue
+                    part = f"\n--- PÁGINA {page_num + 1} ---\n{page_text}\n"
+                    parts.append(part)
+                    length += len(part)
+                    if length > budget:
+                        break
+
+            text_content = "".join(parts)
+            self.stats[f'{self.text_backend}_used'] += 1
+
+            logger.debug(f"{self.text_backend} extraiu {len(text_content)} caracteres de {pdf_path.name}")
             return text_content
 
         except Exception as e:
-            logger.error(f"Erro ao extrair texto do PDF com PyMuPDF {pdf_path}: {e}")
+            logger.error(f"Erro ao extrair texto do PDF com {self.text_backend} {pdf_path}: {e}")
             return ""
 
+    def _iter_pages(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        """(número, texto) de cada página, sob demanda, com o backend configurado"""
+        if self.text_backend == 'pdfium':
+            return self._pages_with_pdfium(pdf_path)
+        return self._pages_with_pymupdf(pdf_path)
+
+    def _text_char_budget(self) -> int:
+        """Caracteres de texto que ainda podem chegar ao prompt depois do truncamento"""
+        if self._token_encoding() is None:
+            return self.max_text_length
+        return self.max_text_tokens * _MAX_CHARS_PER_TOKEN
+
+    def _pages_with_pymupdf(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        """(número, texto) de cada página via PyMuPDF (mesmo método do parser regex que funciona)"""
+        with fitz.open(pdf_path) as doc:
+            for page_num in range(len(doc)):
+                yield page_num, doc.load_page(page_num).get_text()
+
+    def _pages_with_pdfium(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        """(número, texto) de cada página via pypdfium2"""
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            for page_num in range(len(pdf)):
+                page = pdf[page_num]
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+                yield page_num, page_text
+        finally:
+            pdf.close()
+
+    def _token_encoding(self):
+        """Tokenizer do modelo, carregado na primeira chamada (None sem tiktoken ou sem o arquivo de encoding)"""
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            if TIKTOKEN_AVAILABLE and self.max_text_tokens > 0:
+                model_name = self.openrouter.models.get(self.model, self.model).split('/')[-1]
+                try:
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(model_name)
+                    except KeyError:
+                        # Modelos fora do catálogo do tiktoken: o200k_base é uma boa aproximação
+                        self._encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning(f"Tokenizer indisponível ({e}), truncando por caracteres")
+        return self._encoding
+
+    def _truncate_text(self, pdf_text: str) -> str:
+        """Limita o texto a max_text_tokens tokens ou, sem tokenizer, a max_text_length caracteres"""
+        encoding = self._token_encoding()
+        if encoding is None:
+            if len(pdf_text) > self.max_text_length:
+                return pdf_text[:self.max_text_length] + "\n... [TEXTO TRUNCADO] ..."
+            return pdf_text
+
+        # Pré-corte em caracteres: evita tokenizar PDFs enormes que serão truncados de qualquer forma
+        head = pdf_text[:self.max_text_tokens * _MAX_CHARS_PER_TOKEN]
+        tokens = encoding.encode(head, disallowed_special=())
+        self.stats['tokens_sent'] += min(len(tokens), self.max_text_tokens)
+        if len(tokens) > self.max_text_tokens or len(head) < len(pdf_text):
+            return encoding.decode(tokens[:self.max_text_tokens]) + "\n... [TEXTO TRUNCADO] ..."
+        return pdf_text
+
     def _create_extraction_prompt(self, pdf_text: str, numero_documento: str) -> str:
         """Cria o prompt para extração específica do documento"""
 
         # Limitar tamanho do texto se muito grande
-        if len(pdf_text) > self.max_text_length:
-            pdf_text = pdf_text[:self.max_text_length] + "\n... [TEXTO TRUNCADO] ..."
+        pdf_text = self._truncate_text(pdf_text)
 
         return f"""Extraia dados estruturados do seguinte documento CADRI número {numero_documento}:
 
@@ -244,77 +528,110 @@ IMPORTANTE:
 
 IMPORTANTE: Retorne um JSON válido seguindo o schema CADRIExtractionResult com todos os itens de resíduos encontrados."""
 
-    def _clean_json_datetime_formats(self, json_text: str) -> str:
-        """Limpa formatos de datetime comuns que causam erros de validação"""
-        try:
-            # Corrigir :: (dois pontos duplos) para : (um ponto) em timestamps
-            json_text = re.sub(r'T(\d{1,2})::(\d{2})', r'T\1:\2:00', json_text)
+    def _create_multi_extraction_prompt(self, docs: List[Tuple[str, str]]) -> str:
+        """Cria um único prompt para vários documentos (numero_documento, texto), delimitados por bloco"""
+        blocks = []
+        for numero_documento, pdf_text in docs:
+            pdf_text = self._truncate_text(pdf_text)
+            blocks.append(f"=== DOC {numero_documento} ===\n{pdf_text}\n=== END DOC ===")
 
-            # Corrigir formatos incompletos como T12:00 para T12:00:00
-            json_text = re.sub(r'T(\d{1,2}):(\d{2})"', r'T\1:\2:00"', json_text)
+        numeros = ", ".join(numero for numero, _ in docs)
+        joined_blocks = "\n\n".join(blocks)
 
-            # Adicionar segundos se faltando
-            json_text = re.sub(r'T(\d{2}):(\d{2})([^:])"', r'T\1:\2:00\3"', json_text)
+        return f"""Extraia dados estruturados dos {len(docs)} documentos CADRI a seguir ({numeros}):
 
-            logger.debug(f"JSON após limpeza de datetime: {json_text[:200]}...")
-            return json_text
+{joined_blocks}
 
-        except Exception as e:
-            logger.warning(f"Erro na limpeza de datetime, usando texto original: {e}")
-            return json_text
+IMPORTANTE: Retorne um JSON válido no formato {{"results": [...]}}, com um objeto CADRIExtractionResult por documento, na mesma ordem dos blocos e com o "numero_documento" de cada bloco."""
+
+    @staticmethod
+    def _json_text(response: str) -> Optional[str]:
+        """Objeto JSON da resposta; com structured output ela já é o próprio JSON, sem busca por regex"""
+        response = response.strip()
+        if response.startswith('{') and response.endswith('}'):
+            return response
+
+        # Texto antes/depois do JSON (modelos sem suporte a response_format)
+        json_match = _JSON_OBJECT_RE.search(response)
+        return json_match.group(0) if json_match else None
+
+    def _parse_multi_llm_response(self, response: str, numeros: List[str]) -> Optional[Dict[str, CADRIExtractionResult]]:
+        """
+        Parse da resposta multi-documento ({"results": [...]})
+
+        Returns:
+            Resultados válidos por número de documento, ou None se a
+            resposta inteira for inválida
+        """
+        json_text = self._json_text(response)
+        if json_text is None:
+            logger.error(f"Nenhum JSON encontrado na resposta LLM para {numeros}")
+            return None
 
-    def _parse_llm_response(self, response: str, numero_documento: str) -> Optional[CADRIExtractionResult]:
-        """Parse da resposta LLM para objeto estruturado"""
         try:
-            # Limpar resposta - remover possível texto antes/depois do JSON
-            response = response.strip()
-
-            # Tentar extrair JSON da resposta
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if not json_match:
-                logger.error(f"Nenhum JSON encontrado na resposta LLM para {numero_documento}")
-                logger.debug(f"Resposta recebida: {response[:500]}")
-                return None
+            data = _loads(json_text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Erro ao parsear JSON da resposta LLM para {numeros}: {e}")
+            return None
 
-            json_text = json_match.group(0)
+        entries = data.get('results') if isinstance(data, dict) else None
+        if not isinstance(entries, list):
+            logger.error(f"Resposta sem array 'results' para {numeros}")
+            return None
 
-            # PRÉ-VALIDAÇÃO: Limpar problemas comuns de formato antes do JSON parsing
-            json_text = self._clean_json_datetime_formats(json_text)
+        results = {}
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
 
-            data = json.loads(json_text)
+            # Casar pelo número informado; senão, pela posição do bloco
+            numero_documento = str(entry.get('numero_documento') or '')
+            if numero_documento not in numeros:
+                numero_documento = numeros[position] if position < len(numeros) else None
+            if numero_documento is None or numero_documento in results:
+                continue
 
-            # Log para debug
-            logger.debug(f"JSON parseado com sucesso: {list(data.keys())}")
+            entry['numero_documento'] = numero_documento
+            result = self._validate_extraction(entry, numero_documento)
+            if result:
+                results[numero_documento] = result
 
-            # Verificar se tem a estrutura mínima esperada
-            if 'numero_documento' not in data:
-                data['numero_documento'] = numero_documento
+        return results
 
-            if 'total_items' not in data and 'items' in data:
-                data['total_items'] = len(data['items'])
+    def _parse_llm_response(self, response: str, numero_documento: str) -> Optional[CADRIExtractionResult]:
+        """Parse da resposta LLM para objeto estruturado, validando o JSON direto no pydantic-core"""
+        json_text = self._json_text(response)
+        if json_text is None:
+            logger.error(f"Nenhum JSON encontrado na resposta LLM para {numero_documento}")
+            logger.debug(f"Resposta recebida: {response[:500]}")
+            return None
 
-            if 'items' not in data:
-                logger.warning(f"Resposta sem campo 'items' para {numero_documento}")
-                data['items'] = []
-                data['total_items'] = 0
+        try:
+            result = CADRIExtractionResult.model_validate_json(
+                json_text, context={'numero_documento': numero_documento}
+            )
+        except ValidationError as e:
+            if any(error['type'] == 'json_invalid' for error in e.errors()):
+                logger.error(f"Erro ao parsear JSON da resposta LLM para {numero_documento}: {e}")
+                logger.debug(f"JSON inválido: {json_text[:500]}")
+            else:
+                logger.error(f"Erro ao validar dados extraídos para {numero_documento}: {e}")
+                logger.debug(f"Dados problemáticos: {json_text[:500]}")
+            return None
 
-            # Garantir que cada item tem numero_documento
-            for item in data.get('items', []):
-                if 'numero_documento' not in item:
-                    item['numero_documento'] = numero_documento
+        logger.info(f"LLM extraiu {result.total_items} itens do documento {numero_documento}")
+        return result
 
-            # Validar usando Pydantic
-            result = CADRIExtractionResult(**data)
+    def _validate_extraction(self, data: Dict, numero_documento: str) -> Optional[CADRIExtractionResult]:
+        """Valida os dados já decodificados de um documento com Pydantic"""
+        try:
+            result = CADRIExtractionResult.model_validate(data, context={'numero_documento': numero_documento})
             logger.info(f"LLM extraiu {result.total_items} itens do documento {numero_documento}")
             return result
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Erro ao parsear JSON da resposta LLM para {numero_documento}: {e}")
-            logger.debug(f"JSON inválido: {json_text[:500] if 'json_text' in locals() else response[:500]}")
-            return None
         except Exception as e:
             logger.error(f"Erro ao validar dados extraídos para {numero_documento}: {e}")
-            logger.debug(f"Dados problemáticos: {data if 'data' in locals() else 'não disponível'}")
+            logger.debug(f"Dados problemáticos: {data}")
             return None
 
     def _fallback_to_regex_parser(self, pdf_path: Path) -> List[Dict]:
@@ -322,26 +639,19 @@ IMPORTANTE: Retorne um JSON válido seguindo o schema CADRIExtractionResult com
         try:
             logger.warning(f"Usando fallback regex parser para {pdf_path.name}")
 
-            # Import do parser original
-            from pdf_parser_standalone import PDFParserStandalone
-
-            with PDFParserStandalone() as parser:
-                items = parser.parse_pdf(pdf_path)
-                self.stats['fallback_used'] += 1
-                return items
+            # Parser original, reaproveitado entre fallbacks
+            items = _get_standalone_parser().parse_pdf(pdf_path)
+            self.stats['fallback_used'] += 1
+            return items
 
         except Exception as e:
             logger.error(f"Erro no fallback parser para {pdf_path}: {e}")
             # Fallback final: tentar usar Docling parser diretamente
             try:
                 logger.warning(f"Tentando fallback final com Docling parser para {pdf_path.name}")
-                sys.path.insert(0, str(Path(__file__).parent.parent))
-                from docling_parser import DoclingPDFParser, DOCLING_AVAILABLE
-
-                if DOCLING_AVAILABLE:
-                    docling_parser = DoclingPDFParser()
-                    fallback_parser = DoclingPDFParser()
-                    return fallback_parser.parse_pdf(pdf_path)
+                docling_parser = _get_docling_parser()
+                if docling_parser is not None:
+                    return docling_parser.parse_pdf(pdf_path)
             except Exception as e2:
                 logger.error(f"Fallback final também falhou para {pdf_path}: {e2}")
 
@@ -358,6 +668,15 @@ IMPORTANTE: Retorne um JSON válido seguindo o schema CADRIExtractionResult com
         Returns:
             Lista de dicionários com dados extraídos
         """
+        async def run() -> List[Dict]:
+            async with self:
+                return await self._aparse_pdf(pdf_path, force_reparse)
+
+        return _run_coroutine(run())
+
+    async def _aparse_pdf(self, pdf_path: Path, force_reparse: bool = False,
+                          semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict]:
+        """Versão assíncrona de parse_pdf; o semáforo limita os documentos em processamento"""
         numero_documento = pdf_path.stem
 
         # Verificar cache
@@ -365,66 +684,227 @@ IMPORTANTE: Retorne um JSON válido seguindo o schema CADRIExtractionResult com
             logger.info(f"PDF {numero_documento} já processado (cache)")
             self.stats['cache_hits'] += 1
             return []
+        # Tentado uma vez por instância, mesmo sem itens ou com fallback, para que
+        # passadas repetidas (pipeline durante os downloads) não o reenviem ao LLM
+        self.parsed_cache.add(numero_documento)
 
-        logger.info(f"Processando PDF com LLM: {numero_documento}")
+        async with semaphore or contextlib.nullcontext():
+            logger.info(f"Processando PDF com LLM: {numero_documento}")
 
-        # Extrair texto do PDF
-        pdf_text = self._extract_text_from_pdf(pdf_path)
-        if not pdf_text.strip():
-            logger.error(f"Nenhum texto extraído do PDF {numero_documento}")
-            self.stats['errors'] += 1
-            return []
+            # Extrair texto do PDF (CPU, fora do event loop)
+            pdf_text = await asyncio.to_thread(self._extract_text_from_pdf, pdf_path)
+            if not pdf_text.strip():
+                logger.error(f"Nenhum texto extraído do PDF {numero_documento}")
+                self.stats['errors'] += 1
+                return []
+
+            cached_items = self._cached_items(pdf_path, pdf_text)
+            if cached_items is not None:
+                return cached_items
+
+            return await self._arequest_single(pdf_path, pdf_text)
+
+    def _response_cache_key(self, pdf_text: str) -> str:
+        return LLMResponseCache.make_key(self.model, self.system_prompt, pdf_text)
+
+    def _cached_items(self, pdf_path: Path, pdf_text: str) -> Optional[List[Dict]]:
+        """Itens a partir de uma resposta já validada para o mesmo modelo, prompt e texto"""
+        cached_response = self.response_cache.get(self._response_cache_key(pdf_text))
+        if cached_response is None:
+            return None
+
+        logger.info(f"Resposta LLM em cache para {pdf_path.stem}")
+        self.stats['llm_cache_hits'] += 1
+        return self._validated_items(cached_response, pdf_path.stem)
+
+    async def _arequest_single(self, pdf_path: Path, pdf_text: str) -> List[Dict]:
+        """Uma requisição ao LLM para um único documento"""
+        numero_documento = pdf_path.stem
 
         try:
             # Criar prompt de extração
             prompt = self._create_extraction_prompt(pdf_text, numero_documento)
 
             # Chamar LLM via OpenRouter
-            response = self.openrouter.single_request(
+            response = await self.openrouter.asingle_request(
                 system_prompt=self.system_prompt,
                 message=prompt,
                 model=self.model,
-                temperature=self.temperature
+                temperature=self.temperature,
+                response_format=_json_schema_format() if self.json_schema else None
             )
 
-            if not response:
-                logger.error(f"Resposta vazia do LLM para {numero_documento}")
-                self.stats['llm_errors'] += 1
-                return self._fallback_to_regex_parser(pdf_path)
+            items = self._validated_items(response, numero_documento,
+                                          cache_key=self._response_cache_key(pdf_text))
 
-            # Parse da resposta estruturada
-            extraction_result = self._parse_llm_response(response, numero_documento)
+        except Exception as e:
+            logger.error(f"Erro geral no processamento LLM de {numero_documento}: {e}")
+            self.stats['errors'] += 1
+            items = None
 
-            if not extraction_result:
-                logger.error(f"Falha ao parsear resposta LLM para {numero_documento}")
-                self.stats['llm_errors'] += 1
-                return self._fallback_to_regex_parser(pdf_path)
+        if items is None:
+            # Regex/Docling são síncronos e pesados: rodam fora do event loop
+            items = await asyncio.to_thread(self._fallback_to_regex_parser, pdf_path)
+        return items
 
-            # Converter para formato de dicionários compatível com CSV
-            items_data = []
-            for item in extraction_result.items:
-                item_dict = flatten_item_to_dict(item)
-                items_data.append(item_dict)
+    async def _aparse_group(self, pdf_paths: List[Path], force_reparse: bool = False,
+                            semaphore: Optional[asyncio.Semaphore] = None) -> List[List[Dict]]:
+        """
+        Processa um grupo de PDFs com o menor número de requisições ao LLM
 
-            self.stats['processed'] += 1
-            self.stats['items_extracted'] += len(items_data)
+        Os textos são empacotados em sub-grupos que cabem em max_text_length
+        e cada sub-grupo vai em um único prompt multi-documento.
 
-            # Adicionar ao cache
-            self.parsed_cache.add(numero_documento)
+        Returns:
+            Lista de itens de cada documento processado
+        """
+        pending = []
+        for pdf_path in pdf_paths:
+            # Verificar cache
+            if not force_reparse and pdf_path.stem in self.parsed_cache:
+                logger.info(f"PDF {pdf_path.stem} já processado (cache)")
+                self.stats['cache_hits'] += 1
+                continue
+            # Tentado uma vez por instância, como em _aparse_pdf
+            self.parsed_cache.add(pdf_path.stem)
+            pending.append(pdf_path)
 
-            logger.info(f"LLM extraiu {len(items_data)} itens do documento {numero_documento}")
+        if not pending:
+            return []
 
-            return items_data
+        async with semaphore or contextlib.nullcontext():
+            docs, results = [], []
+            for pdf_path in pending:
+                logger.info(f"Processando PDF com LLM: {pdf_path.stem}")
+
+                pdf_text = await asyncio.to_thread(self._extract_text_from_pdf, pdf_path)
+                if not pdf_text.strip():
+                    logger.error(f"Nenhum texto extraído do PDF {pdf_path.stem}")
+                    self.stats['errors'] += 1
+                    continue
+
+                cached_items = self._cached_items(pdf_path, pdf_text)
+                if cached_items is not None:
+                    results.append(cached_items)
+                    continue
+                docs.append((pdf_path, pdf_text))
+
+            for group in self._pack_documents(docs):
+                results.extend(await self._arequest_group(group))
+            return results
+
+    def _pack_documents(self, docs: List[Tuple[Path, str]]) -> List[List[Tuple[Path, str]]]:
+        """Agrupa até docs_per_request documentos enquanto a soma dos textos couber em max_text_length"""
+        groups = []
+        group, group_length = [], 0
+
+        for pdf_path, pdf_text in docs:
+            text_length = min(len(pdf_text), self.max_text_length)
+            if group and (len(group) >= self.docs_per_request or group_length + text_length > self.max_text_length):
+                groups.append(group)
+                group, group_length = [], 0
+            group.append((pdf_path, pdf_text))
+            group_length += text_length
+
+        if group:
+            groups.append(group)
+        return groups
+
+    async def _arequest_group(self, group: List[Tuple[Path, str]]) -> List[List[Dict]]:
+        """Uma requisição multi-documento; documentos sem resultado válido são refeitos individualmente"""
+        if len(group) == 1:
+            pdf_path, pdf_text = group[0]
+            return [await self._arequest_single(pdf_path, pdf_text)]
+
+        numeros = [pdf_path.stem for pdf_path, _ in group]
+        results = None
 
+        try:
+            response = await self.openrouter.asingle_request(
+                system_prompt=self.system_prompt,
+                message=self._create_multi_extraction_prompt([(pdf_path.stem, pdf_text) for pdf_path, pdf_text in group]),
+                model=self.model,
+                temperature=self.temperature,
+                response_format=_json_schema_format(multi=True) if self.json_schema else None
+            )
+            if response:
+                results = self._parse_multi_llm_response(response, numeros)
         except Exception as e:
-            logger.error(f"Erro geral no processamento LLM de {numero_documento}: {e}")
-            self.stats['errors'] += 1
+            logger.error(f"Erro na requisição multi-documento para {numeros}: {e}")
+
+        if results is None:
+            logger.warning(f"Resposta multi-documento inválida para {numeros}, processando individualmente")
+            results = {}
+
+        items_per_doc = []
+        for pdf_path, pdf_text in group:
+            extraction_result = results.get(pdf_path.stem)
+            if extraction_result is None:
+                items_per_doc.append(await self._arequest_single(pdf_path, pdf_text))
+            else:
+                self.response_cache.set(self._response_cache_key(pdf_text), extraction_result.model_dump_json())
+                items_per_doc.append(self._items_from_result(extraction_result, pdf_path.stem))
+        return items_per_doc
+
+    def _items_from_response(self, response: Optional[str], pdf_path: Path, numero_documento: str) -> List[Dict]:
+        """Converte a resposta do LLM em itens para o CSV, usando o fallback se ela for inválida"""
+        items = self._validated_items(response, numero_documento)
+        if items is None:
             return self._fallback_to_regex_parser(pdf_path)
+        return items
+
+    def _validated_items(self, response: Optional[str], numero_documento: str,
+                         cache_key: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Converte a resposta do LLM em itens para o CSV, ou None se ela for inválida
+
+        Com cache_key, a resposta é gravada no cache de respostas depois de validada.
+        """
+        if not response:
+            logger.error(f"Resposta vazia do LLM para {numero_documento}")
+            self.stats['llm_errors'] += 1
+            return None
+
+        # Parse da resposta estruturada
+        extraction_result = self._parse_llm_response(response, numero_documento)
+
+        if not extraction_result:
+            logger.error(f"Falha ao parsear resposta LLM para {numero_documento}")
+            self.stats['llm_errors'] += 1
+            return None
+
+        if cache_key:
+            self.response_cache.set(cache_key, response)
+
+        return self._items_from_result(extraction_result, numero_documento)
+
+    def _items_from_result(self, extraction_result: CADRIExtractionResult, numero_documento: str) -> List[Dict]:
+        """Converte um resultado validado em itens para o CSV e marca o documento como processado"""
+        # Converter para formato de dicionários compatível com CSV
+        items_data = []
+        for item in extraction_result.items:
+            item_dict = flatten_item_to_dict(item)
+            items_data.append(item_dict)
+
+        self.stats['processed'] += 1
+        self.stats['items_extracted'] += len(items_data)
+
+        # Adicionar ao cache
+        self.parsed_cache.add(numero_documento)
+
+        logger.info(f"LLM extraiu {len(items_data)} itens do documento {numero_documento}")
+
+        return items_data
 
     def parse_all_pdfs(self, filter_type: str = None, force_reparse: bool = False) -> Dict[str, int]:
         """
         Parse todos os PDFs usando LLM
 
+        Os PDFs são processados concorrentemente (até LLM_CONCURRENCY
+        grupos em andamento), com até LLM_DOCS_PER_REQUEST documentos por
+        requisição ao LLM, salvando os itens em lotes à medida que cada
+        grupo termina.
+
         Args:
             filter_type: Filtro por tipo de documento (não usado no LLM parser)
             force_reparse: Se True, reprocessa todos os PDFs
@@ -446,72 +926,262 @@ IMPORTANTE: Retorne um JSON válido seguindo o schema CADRIExtractionResult com
 
         logger.info(f"Encontrados {len(pdf_files)} PDFs para processar")
 
-        all_items = []
-        processed_count = 0
+        processed_count = _run_coroutine(self._aparse_all_pdfs(pdf_files, force_reparse))
+        self._finalize_items()
 
-        for pdf_path in pdf_files:
-            try:
-                items = self.parse_pdf(pdf_path, force_reparse)
+        # Atualizar estatísticas finais
+        self.stats['total_pdfs'] = len(pdf_files)
+        self.stats['processed_pdfs'] = processed_count
 
-                if items:
-                    all_items.extend(items)
-                    processed_count += 1
+        logger.info(f"=== LLM Parser Concluído ===")
+        logger.info(f"PDFs processados: {processed_count}/{len(pdf_files)}")
+        logger.info(f"Itens extraídos: {self.stats['items_extracted']}")
+        logger.info(f"PyMuPDF usado: {self.stats['pymupdf_used']}")
+        logger.info(f"pdfium usado: {self.stats['pdfium_used']}")
+        logger.info(f"Tokens enviados: {self.stats['tokens_sent']}")
+        logger.info(f"Erros LLM: {self.stats['llm_errors']}")
+        logger.info(f"Fallbacks usados: {self.stats['fallback_used']}")
+        logger.info(f"Cache hits: {self.stats['cache_hits']}")
+        logger.info(f"Respostas LLM em cache: {self.stats['llm_cache_hits']}")
+
+        return self.stats
 
-                    # Salvar em batches para não perder dados
-                    if len(all_items) >= self.batch_size:
-                        self._save_items_batch(all_items)
-                        all_items = []
+    async def _aparse_all_pdfs(self, pdf_files: List[Path], force_reparse: bool) -> int:
+        """Processa os PDFs concorrentemente; retorna quantos geraram itens"""
+        semaphore = asyncio.Semaphore(self.concurrency)
 
+        async def parse_chunk(chunk: List[Path]) -> List[List[Dict]]:
+            try:
+                return await self._aparse_group(chunk, force_reparse, semaphore)
             except Exception as e:
-                logger.error(f"Erro ao processar {pdf_path}: {e}")
+                logger.error(f"Erro ao processar {[str(pdf_path) for pdf_path in chunk]}: {e}")
                 self.stats['errors'] += 1
+                return []
+
+        # Grupos de até docs_per_request PDFs, cada um em poucas requisições multi-documento
+        chunks = [pdf_files[i:i + self.docs_per_request]
+                  for i in range(0, len(pdf_files), self.docs_per_request)]
+
+        all_items = []
+        processed_count = 0
+
+        async with self:
+            for task in asyncio.as_completed([parse_chunk(chunk) for chunk in chunks]):
+                for items in await task:
+                    if items:
+                        all_items.extend(items)
+                        processed_count += 1
+
+                        # Salvar em batches para não perder dados
+                        if len(all_items) >= self.batch_size:
+                            self._save_items_batch(all_items)
+                            all_items = []
+
+        # Salvar itens restantes
+        if all_items:
+            self._save_items_batch(all_items)
+
+        return processed_count
+
+    def _batch_client(self):
+        """Cliente OpenAI direto para a Batch API"""
+        if not OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY is required for the Batch API")
+
+        from openai import OpenAI
+        return OpenAI(api_key=OPENAI_API_KEY)
+
+    def _batch_model(self) -> str:
+        """Nome do modelo na OpenAI (a Batch API só atende modelos OpenAI)"""
+        model = self.openrouter.models.get(self.model, self.model)
+        if not model.startswith('openai/'):
+            raise ValueError(f"Batch API only supports OpenAI models, got: {model}")
+        return model[len('openai/'):]
+
+    def submit_batch(self, pdf_files: List[Path], force_reparse: bool = False) -> Optional[str]:
+        """
+        Envia os prompts de extração dos PDFs para a Batch API (janela de 24h)
+
+        Cada PDF vira uma linha JSONL com custom_id = número do documento.
+
+        Returns:
+            ID do batch criado, ou None se não houver PDFs a enviar
+        """
+        client = self._batch_client()
+        model = self._batch_model()
+
+        LLM_BATCH_DIR.mkdir(parents=True, exist_ok=True)
+        jsonl_path = LLM_BATCH_DIR / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+        request_count = 0
+        with open(jsonl_path, 'wb') as f:
+            for pdf_path in pdf_files:
+                numero_documento = pdf_path.stem
+
+                if not force_reparse and numero_documento in self.parsed_cache:
+                    self.stats['cache_hits'] += 1
+                    continue
+
+                pdf_text = self._extract_text_from_pdf(pdf_path)
+                if not pdf_text.strip():
+                    logger.error(f"Nenhum texto extraído do PDF {numero_documento}")
+                    self.stats['errors'] += 1
+                    continue
+
+                request = {
+                    "custom_id": numero_documento,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": model,
+                        "temperature": self.temperature,
+                        "messages": [
+                            {"role": "system", "content": self.system_prompt},
+                            {"role": "user", "content": self._create_extraction_prompt(pdf_text, numero_documento)}
+                        ]
+                    }
+                }
+                if self.json_schema:
+                    request["body"]["response_format"] = _json_schema_format()
+                f.write(_dumps_line(request))
+                request_count += 1
+
+        if not request_count:
+            logger.warning("Nenhum PDF novo para enviar à Batch API")
+            return None
+
+        with open(jsonl_path, 'rb') as f:
+            batch_file = client.files.create(file=f, purpose="batch")
+
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+
+        logger.info(f"Batch {batch.id} enviado com {request_count} documentos ({jsonl_path.name})")
+        return batch.id
+
+    def wait_for_batch(self, batch_id: str, poll_interval: int = 60) -> Dict[str, int]:
+        """
+        Aguarda o batch terminar e grava os itens extraídos no CSV
+
+        Respostas inválidas passam pelo mesmo fallback regex do modo síncrono.
+        """
+        client = self._batch_client()
+        CSVStore.ensure_csv(Path(CSV_CADRI_ITEMS), CSVSchemas.CADRI_ITEMS_COLS)
+
+        while True:
+            batch = client.batches.retrieve(batch_id)
+            if batch.status == 'completed':
+                break
+            if batch.status in ('failed', 'expired', 'cancelled'):
+                logger.error(f"Batch {batch_id} terminou com status {batch.status}")
+                return self.stats
+
+            logger.info(f"Batch {batch_id}: {batch.status}, aguardando {poll_interval}s")
+            time.sleep(poll_interval)
+
+        if not batch.output_file_id:
+            logger.error(f"Batch {batch_id} concluído sem arquivo de saída")
+            return self.stats
+
+        output = client.files.content(batch.output_file_id).text
+
+        all_items = []
+        processed_count = 0
+
+        for line in output.splitlines():
+            if not line.strip():
                 continue
 
+            record = _loads(line)
+            numero_documento = record['custom_id']
+            body = (record.get('response') or {}).get('body') or {}
+            choices = body.get('choices') or []
+            response = choices[0]['message']['content'] if choices else None
+
+            items = self._items_from_response(response, self.pdf_dir / f"{numero_documento}.pdf", numero_documento)
+
+            if items:
+                all_items.extend(items)
+                processed_count += 1
+
+                # Salvar em batches para não perder dados
+                if len(all_items) >= self.batch_size:
+                    self._save_items_batch(all_items)
+                    all_items = []
+
         # Salvar itens restantes
         if all_items:
             self._save_items_batch(all_items)
+        self._finalize_items()
 
-        # Atualizar estatísticas finais
-        self.stats['total_pdfs'] = len(pdf_files)
         self.stats['processed_pdfs'] = processed_count
-
-        logger.info(f"=== LLM Parser Concluído ===")
-        logger.info(f"PDFs processados: {processed_count}/{len(pdf_files)}")
-        logger.info(f"Itens extraídos: {self.stats['items_extracted']}")
-        logger.info(f"PyMuPDF usado: {self.stats['pymupdf_used']}")
-        logger.info(f"Erros LLM: {self.stats['llm_errors']}")
-        logger.info(f"Fallbacks usados: {self.stats['fallback_used']}")
-        logger.info(f"Cache hits: {self.stats['cache_hits']}")
+        logger.info(f"Batch {batch_id}: {processed_count} documentos processados, "
+                    f"{self.stats['items_extracted']} itens extraídos")
 
         return self.stats
 
+    def parse_all_pdfs_batch(self, force_reparse: bool = False, poll_interval: int = 60) -> Dict[str, int]:
+        """Processa todos os PDFs via Batch API (modo offline, ~50% do custo do modo síncrono)"""
+        logger.info("=== Iniciando LLM PDF Parser (Batch API) ===")
+
+        pdf_files = list(self.pdf_dir.glob("*.pdf"))
+        if not pdf_files:
+            logger.warning(f"Nenhum PDF encontrado em {self.pdf_dir}")
+            return self.stats
+
+        self.stats['total_pdfs'] = len(pdf_files)
+
+        batch_id = self.submit_batch(pdf_files, force_reparse)
+        if not batch_id:
+            return self.stats
+
+        return self.wait_for_batch(batch_id, poll_interval)
+
     def _save_items_batch(self, items: List[Dict]) -> None:
         """Salva um lote de itens no CSV"""
         if not items:
             return
 
         try:
-            df_items = pd.DataFrame(items)
+            # Colunas do schema, na ordem, em uma única construção (chaves extras são descartadas
+            # e colunas ausentes ficam vazias)
+            df_items = pd.DataFrame(items, columns=CSVSchemas.CADRI_ITEMS_COLS)
 
-            # Garantir que todas as colunas esperadas existem
-            for col in CSVSchemas.CADRI_ITEMS_COLS:
-                if col not in df_items.columns:
-                    df_items[col] = None
+            # Append no CSV de staging (sem reler o CSV final a cada lote)
+            rows_appended = CSVStore.append(df_items, Path(CSV_CADRI_ITEMS_STAGING))
 
-            # Reordenar colunas conforme schema
-            df_items = df_items[CSVSchemas.CADRI_ITEMS_COLS]
+            logger.info(f"Salvos {rows_appended} itens no staging")
 
-            # Fazer upsert no CSV
-            rows_upserted = CSVStore.upsert(
-                df_items,
-                Path(CSV_CADRI_ITEMS),
-                keys=['numero_documento', 'item_numero', 'numero_residuo']
-            )
+        except Exception as e:
+            logger.error(f"Erro ao salvar batch de itens: {e}")
+
+    def _finalize_items(self) -> None:
+        """Incorpora o staging ao CSV de itens com um único upsert deduplicado"""
+        staging = Path(CSV_CADRI_ITEMS_STAGING)
+
+        try:
+            keys = ['numero_documento', 'item_numero', 'numero_residuo']
+
+            # Trava da leitura à remoção, para nenhum append se perder no meio
+            with CSVStore.write_lock:
+                if not staging.exists():
+                    return
+
+                df_staged = CSVStore.load_csv(staging)
+
+                if not df_staged.empty:
+                    # O staging pode repetir itens entre lotes; vale o mais recente
+                    df_staged = df_staged.drop_duplicates(subset=keys, keep='last')
+                    rows_upserted = CSVStore.upsert(df_staged, Path(CSV_CADRI_ITEMS), keys=keys)
+                    logger.info(f"Salvos {rows_upserted} itens no CSV")
 
-            logger.info(f"Salvos {rows_upserted} itens no CSV")
+                staging.unlink()
 
         except Exception as e:
-            logger.error(f"Erro ao salvar batch de itens: {e}")
+            logger.error(f"Erro ao consolidar itens do staging: {e}")
 
 
 def main():
@@ -521,6 +1191,9 @@ def main():
     parser = argparse.ArgumentParser(description='LLM PDF Parser para documentos CADRI')
     parser.add_argument('--document', help='Número específico do documento para processar')
     parser.add_argument('--force-reparse', action='store_true', help='Reprocessar PDFs já processados')
+    parser.add_argument('--batch', action='store_true',
+                       help='Processar todos os PDFs via Batch API da OpenAI (offline, menor custo)')
+    parser.add_argument('--batch-id', help='Retomar a espera de um batch já enviado')
     parser.add_argument('--model', default='gpt-5-mini',
                        choices=['cost-optimized', 'flagship', 'free-gemini', 'grok-4-fast-free', 'deepseek', 'gpt-4o-mini', 'gpt-5-mini'],
                        help='Modelo LLM a usar')
@@ -537,6 +1210,12 @@ def main():
             print(f"Extraídos {len(items)} itens do documento {args.document}")
         else:
             print(f"PDF {args.document} não encontrado")
+    elif args.batch_id:
+        stats = llm_parser.wait_for_batch(args.batch_id)
+        print(f"Processamento concluído: {stats}")
+    elif args.batch:
+        stats = llm_parser.parse_all_pdfs_batch(force_reparse=args.force_reparse)
+        print(f"Processamento concluído: {stats}")
     else:
         # Processar todos os PDFs
         stats = llm_parser.parse_all_pdfs(force_reparse=args.force_reparse)
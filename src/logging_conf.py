@@ -1,5 +1,12 @@
+import atexit
+import copy
 import logging
+import multiprocessing
+import os
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -21,6 +28,8 @@ class ColoredFormatter(logging.Formatter):
 
     def format(self, record):
         if sys.stdout.isatty():
+            # Color a copy: the same record also goes to the file handler
+            record = copy.copy(record)
             levelname = record.levelname
             record.levelname = f"{self.COLORS.get(levelname, '')}{levelname}{self.RESET}"
         return super().format(record)
@@ -38,11 +47,14 @@ class MetricsLogger:
             'pdfs_parsed': 0,
             'errors': 0,
         }
+        # The pipeline runs detail scraping in a worker thread
+        self._lock = threading.Lock()
 
     def increment(self, metric: str, count: int = 1):
         """Increment a counter"""
         if metric in self.counters:
-            self.counters[metric] += count
+            with self._lock:
+                self.counters[metric] += count
 
     def get_elapsed(self) -> float:
         """Get elapsed time in seconds"""
@@ -72,14 +84,25 @@ class MetricsLogger:
         )
 
 
+# Background thread that drains the log queue into the real handlers, and
+# the process that started it (forked children inherit the object, not the thread)
+_log_listener: Optional[QueueListener] = None
+_log_listener_pid: Optional[int] = None
+
+
 def setup_logging(
     name: Optional[str] = None,
     level: Optional[str] = None,
-    log_file: bool = True
+    log_file: bool = True,
+    use_queue: bool = True
 ) -> tuple[logging.Logger, MetricsLogger]:
     """
     Setup logging configuration
 
+    Args:
+        use_queue: Write through a QueueListener thread (False writes from
+            the calling thread, as worker processes must)
+
     Returns:
         Tuple of (logger, metrics)
     """
@@ -95,6 +118,12 @@ def setup_logging(
     # Clear existing handlers
     logger.handlers.clear()
 
+    global _log_listener, _log_listener_pid
+    if _log_listener is not None:
+        if _log_listener_pid == os.getpid():
+            _log_listener.stop()
+        _log_listener = None
+
     # Console handler with colors
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(
@@ -103,9 +132,8 @@ def setup_logging(
             datefmt='%Y-%m-%d %H:%M:%S'
         )
     )
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
 
-    # File handler
     if log_file:
         LOG_FILE.parent.mkdir(exist_ok=True)
         file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
@@ -115,7 +143,19 @@ def setup_logging(
                 datefmt='%Y-%m-%d %H:%M:%S'
             )
         )
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if use_queue:
+        # Console and file writes happen on a listener thread; logging calls
+        # only enqueue the record, so they never block the event loop
+        log_queue = queue.Queue(-1)
+        logger.addHandler(QueueHandler(log_queue))
+        _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _log_listener.start()
+        _log_listener_pid = os.getpid()
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     # Create metrics instance
     metrics = MetricsLogger()
@@ -123,5 +163,36 @@ def setup_logging(
     return logger, metrics
 
 
+def init_worker_logging():
+    """
+    ProcessPoolExecutor initializer: log straight to the handlers in workers
+
+    A worker inherits (fork) or rebuilds (spawn) the queue setup, but no
+    listener thread drains it there and the worker exits without atexit
+    hooks, so its records would be lost.
+    """
+    setup_logging(use_queue=False)
+
+
+def worker_mp_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for ProcessPoolExecutors: forkserver, or spawn where unavailable
+
+    The QueueListener thread runs in every process that imports this
+    module, and forking a process with live threads can deadlock the child
+    on a lock one of them held.
+    """
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(start_method)
+
+
+def _stop_log_listener():
+    """Flush queued records to the handlers on interpreter exit"""
+    if _log_listener is not None and _log_listener_pid == os.getpid():
+        _log_listener.stop()
+
+
+atexit.register(_stop_log_listener)
+
 # Global instances
 logger, metrics = setup_logging()
\ No newline at end of file
@@ -1,23 +1,127 @@
 import fitz  # PyMuPDF
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
-import pandas as pd
 
-from config import PDF_DIR, CSV_CADRI_ITEMS
+from config import PDF_DIR, CSV_CADRI_ITEMS, CSV_CADRI_ITEMS_REGEX_STAGING, KEEP_RAW_FRAGMENTS
 from utils_text import (
     normalize_text, extract_quantity_unit, is_valid_residue_name,
     normalize_classe, create_pdf_search_patterns
 )
 from store_csv import CSVStore, get_unparsed_pdfs
-from logging_conf import logger, metrics
+from logging_conf import logger, metrics, init_worker_logging, worker_mp_context
+
+
+# Compiled once at import and shared by every PDFParser
+_PATTERNS = create_pdf_search_patterns()
+_HEADER_RE = re.compile(r'res[ií]duo.*classe.*estado.*quantidade', re.IGNORECASE)
+_HEADER_WORDS = ('classe', 'estado', 'quantidade')
+# Cell delimiters in priority order: tab, pipe, then runs of 2+ spaces
+_DELIM_RES = (re.compile(r'\t'), re.compile(r'\|'), re.compile(r'  +'))
+
+# Unique key of an item row in CSV_CADRI_ITEMS
+_ITEM_KEYS = ['numero_documento', 'residuo', 'classe', 'estado_fisico', 'quantidade']
+
+# Column order of the staging file (every append must match its header)
+_ITEM_COLS = _ITEM_KEYS + ['unidade', 'pagina_origem', 'raw_fragment']
+
+# Staging dtypes: columns that repeat across rows are loaded as categories
+# (one copy of each value), the rest stay plain strings
+_ITEM_DTYPES = {col: str for col in _ITEM_COLS}
+_ITEM_DTYPES.update(dict.fromkeys(
+    ['numero_documento', 'classe', 'estado_fisico', 'unidade', 'pagina_origem'], 'category'
+))
+
+
+def _worker_count() -> int:
+    """CPUs this process may run on (affinity-aware where supported)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@lru_cache(maxsize=4096)
+def _parse_row_fields(line: str) -> Optional[Tuple[str, str, str, str, str]]:
+    """
+    Parse the cells of a table row line (memoized: boilerplate lines repeat across pages)
+
+    Returns:
+        Tuple of (residuo, classe, estado_fisico, quantidade, unidade), or
+        None if the line is not a valid row
+    """
+    # Try delimiters in priority order, so a double space inside a
+    # tab- or pipe-separated cell does not split it
+    parts = []
+    for delim_re in _DELIM_RES:
+        parts = [p for p in (s.strip() for s in delim_re.split(line)) if p]
+        if len(parts) >= 3:  # Need at least residue, class, state
+            break
+
+    if len(parts) < 3:  # Need at least residue, class, state
+        # Try regex pattern
+        match = _PATTERNS['table_row'].search(line)
+        if match:
+            parts = match.groups()
+        else:
+            return None
+
+    try:
+        residuo = parts[0]
+        classe = normalize_classe(parts[1]) if len(parts) > 1 else ''
+        estado_fisico = parts[2].lower() if len(parts) > 2 else ''
+        quantidade, unidade = '', ''
+
+        # Extract quantity if available
+        if len(parts) > 3:
+            quantidade, unidade = extract_quantity_unit(parts[3])
+
+        # Validate
+        if is_valid_residue_name(residuo):
+            return residuo, classe, estado_fisico, quantidade, unidade
+
+    except Exception as e:
+        logger.debug(f"Error parsing table row: {e}")
+
+    return None
+
+
+# One parser per worker process, created on first use
+_worker_parser = None
+
+
+def _parse_one(pdf_path: Path) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Worker: parse one pending PDF
+
+    Returns:
+        Tuple of (items, metrics counted in this worker) - the parent
+        process merges the counters, since workers have their own copy
+    """
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = PDFParser()
+
+    if not pdf_path.exists():
+        logger.warning(f"PDF file not found: {pdf_path}")
+        return [], {}
+
+    before = dict(metrics.counters)
+    items = _worker_parser.parse_pdf(pdf_path)
+    counted = {
+        metric: value - before[metric]
+        for metric, value in metrics.counters.items()
+        if value != before[metric]
+    }
+    return items, counted
 
 
 class PDFParser:
     """Extract waste information from CADRI PDFs"""
 
-    def __init__(self):
-        self.patterns = create_pdf_search_patterns()
+    patterns = _PATTERNS
 
     def parse_pdf(self, pdf_path: Path) -> List[Dict]:
         """
@@ -33,22 +137,24 @@ class PDFParser:
         numero_documento = pdf_path.stem  # filename without extension
 
         try:
-            doc = fitz.open(pdf_path)
-
-            for page_num, page in enumerate(doc, 1):
-                text = page.get_text()
-
-                # Try different extraction methods
-                # 1. Look for structured table
-                table_items = self.extract_from_table(text, page_num)
-                items.extend(table_items)
-
-                # 2. Look for labeled fields
-                if not table_items:
-                    field_items = self.extract_from_fields(text, page_num)
-                    items.extend(field_items)
-
-            doc.close()
+            # Closed even when a page fails, so the document is never leaked
+            with fitz.open(pdf_path) as doc:
+                for page_num in range(1, doc.page_count + 1):
+                    # Layout blocks (text blocks only); joined they equal page.get_text()
+                    page = doc.load_page(page_num - 1)
+                    blocks = [block[4] for block in page.get_text("blocks") if block[6] == 0]
+                    page = None  # only one page alive at a time
+                    text = "".join(blocks)
+
+                    # Try different extraction methods
+                    # 1. Look for structured table, starting at the block that mentions it
+                    table_items = self.extract_from_table(self.table_region(blocks) or text, page_num)
+                    items.extend(table_items)
+
+                    # 2. Look for labeled fields
+                    if not table_items:
+                        field_items = self.extract_from_fields(text, page_num)
+                        items.extend(field_items)
 
             # Add document number to all items
             for item in items:
@@ -66,35 +172,43 @@ class PDFParser:
 
         return items
 
+    @staticmethod
+    def table_region(blocks: List[str]) -> Optional[str]:
+        """Text from the first block mentioning resíduo onwards (skips page headers before the table)"""
+        for i, block in enumerate(blocks):
+            folded = block.casefold()
+            if 'resíduo' in folded or 'residuo' in folded:
+                return "".join(blocks[i:])
+        return None
+
     def extract_from_table(self, text: str, page_num: int) -> List[Dict]:
         """Extract items from table format"""
         items = []
 
-        # Look for table headers
-        header_pattern = re.compile(
-            r'res[ií]duo.*classe.*estado.*quantidade',
-            re.IGNORECASE
-        )
-
-        if not header_pattern.search(text):
+        # Cheap substring checks first: most pages never mention every header word
+        folded = text.casefold()
+        if ('resíduo' not in folded and 'residuo' not in folded) or not all(
+            word in folded for word in _HEADER_WORDS
+        ):
             return items
 
-        # Split text into lines
-        lines = text.split('\n')
-
-        # Find header line
-        header_idx = -1
-        for i, line in enumerate(lines):
-            if header_pattern.search(line):
-                header_idx = i
-                break
+        # Look for table headers; '.' never crosses a newline, so the first
+        # match in the whole text lies on the first header line
+        header = _HEADER_RE.search(text)
+        if not header:
+            return items
 
-        if header_idx == -1:
+        header_idx = text.count('\n', 0, header.start())
+        header_end = text.find('\n', header.end())
+        if header_end == -1:
             return items
 
+        # Split only the (up to 49) lines after the header
+        rows = text[header_end + 1:].split('\n', 49)[:49]
+
         # Process lines after header
-        for i in range(header_idx + 1, min(header_idx + 50, len(lines))):
-            line = lines[i].strip()
+        for i, line in enumerate(rows, header_idx + 1):
+            line = line.strip()
 
             if not line or len(line) < 10:
                 continue
@@ -108,49 +222,20 @@ class PDFParser:
 
     def parse_table_row(self, line: str, page_num: int, line_num: int) -> Optional[Dict]:
         """Parse a single table row"""
-        # Try different delimiters
-        delimiters = ['\t', '|', '  ']  # tab, pipe, double space
-
-        parts = None
-        for delim in delimiters:
-            if delim in line:
-                parts = [p.strip() for p in line.split(delim) if p.strip()]
-                if len(parts) >= 3:  # Need at least residue, class, state
-                    break
-
-        if not parts or len(parts) < 3:
-            # Try regex pattern
-            match = self.patterns['table_row'].search(line)
-            if match:
-                parts = match.groups()
-            else:
-                return None
-
-        try:
-            item = {
-                'residuo': parts[0],
-                'classe': normalize_classe(parts[1]) if len(parts) > 1 else '',
-                'estado_fisico': parts[2].lower() if len(parts) > 2 else '',
-                'quantidade': '',
-                'unidade': '',
-                'pagina_origem': page_num,
-                'raw_fragment': line[:200]  # Store fragment for debugging
-            }
-
-            # Extract quantity if available
-            if len(parts) > 3:
-                qty, unit = extract_quantity_unit(parts[3])
-                item['quantidade'] = qty
-                item['unidade'] = unit
-
-            # Validate
-            if is_valid_residue_name(item['residuo']):
-                return item
-
-        except Exception as e:
-            logger.debug(f"Error parsing table row: {e}")
+        fields = _parse_row_fields(line)
+        if fields is None:
+            return None
 
-        return None
+        residuo, classe, estado_fisico, quantidade, unidade = fields
+        return {
+            'residuo': residuo,
+            'classe': classe,
+            'estado_fisico': estado_fisico,
+            'quantidade': quantidade,
+            'unidade': unidade,
+            'pagina_origem': page_num,
+            'raw_fragment': line[:200] if KEEP_RAW_FRAGMENTS else ''  # Store fragment for debugging
+        }
 
     def extract_from_fields(self, text: str, page_num: int) -> List[Dict]:
         """Extract items from labeled fields"""
@@ -172,7 +257,7 @@ class PDFParser:
                 'quantidade': qty,
                 'unidade': unit,
                 'pagina_origem': page_num,
-                'raw_fragment': text[:500]
+                'raw_fragment': text[:500] if KEEP_RAW_FRAGMENTS else ''
             }
 
             items.append(item)
@@ -193,26 +278,20 @@ class PDFParser:
 
     def deduplicate_items(self, items: List[Dict]) -> List[Dict]:
         """Remove duplicate items based on key fields"""
-        seen = set()
-        unique_items = []
-
+        # Dict keyed on the item fields: one hash lookup per item, first occurrence wins
+        unique_items = {}
         for item in items:
-            # Create unique key
-            key = (
-                item['residuo'],
-                item['classe'],
-                item['estado_fisico'],
-                item['quantidade']
+            unique_items.setdefault(
+                (item['residuo'], item['classe'], item['estado_fisico'], item['quantidade']),
+                item
             )
 
-            if key not in seen:
-                seen.add(key)
-                unique_items.append(item)
-
-        return unique_items
+        return list(unique_items.values())
 
     def parse_all_pending(self) -> int:
         """Parse all unparsed PDFs"""
+        # Items staged by an interrupted run count as parsed
+        self.compact_staging()
         unparsed = get_unparsed_pdfs()
 
         if not unparsed:
@@ -220,28 +299,52 @@ class PDFParser:
             return 0
 
         logger.info(f"Found {len(unparsed)} unparsed PDFs")
-        total_items = 0
 
-        for numero in unparsed:
-            pdf_path = PDF_DIR / f"{numero}.pdf"
+        # PDFs are independent, so spread them across processes; each PDF's
+        # items are appended to the staging file as soon as they arrive.
+        # Only the CLI (main) runs this path - pipeline.stage_parse uses the
+        # standalone, Docling or LLM parsers. Workers still are not forked:
+        # the logging QueueListener thread is always running in this process
+        pdf_paths = [PDF_DIR / f"{numero}.pdf" for numero in unparsed]
+        with ProcessPoolExecutor(max_workers=_worker_count(), mp_context=worker_mp_context(),
+                                 initializer=init_worker_logging) as executor:
+            for items, counted in executor.map(_parse_one, pdf_paths, chunksize=8):
+                CSVStore.append_records(items, CSV_CADRI_ITEMS_REGEX_STAGING, _ITEM_COLS)
+                for metric, count in counted.items():
+                    metrics.increment(metric, count)
+
+        total_items = self.compact_staging()
 
-            if not pdf_path.exists():
-                logger.warning(f"PDF file not found: {pdf_path}")
-                continue
+        logger.info(f"Parsed {len(unparsed)} PDFs, extracted {total_items} items")
+        return total_items
 
-            items = self.parse_pdf(pdf_path)
+    @staticmethod
+    def compact_staging() -> int:
+        """
+        Fold the append-only staging file into CSV_CADRI_ITEMS
 
-            if items:
-                # Save to CSV
-                df_items = pd.DataFrame(items)
-                CSVStore.upsert(
-                    df_items,
-                    CSV_CADRI_ITEMS,
-                    keys=['numero_documento', 'residuo', 'classe', 'estado_fisico', 'quantidade']
-                )
-                total_items += len(items)
+        Dedups the whole staging in pandas (low-cardinality columns as
+        categories) and saves it with a single upsert, then removes the staging file.
 
-        logger.info(f"Parsed {len(unparsed)} PDFs, extracted {total_items} items")
+        Returns:
+            Number of items saved
+        """
+        staging = CSV_CADRI_ITEMS_REGEX_STAGING
+
+        # Held from load to unlink so no append lands in between and is lost
+        with CSVStore.write_lock:
+            if not staging.exists():
+                return 0
+
+            df_items = CSVStore.load_csv(staging, dtype=_ITEM_DTYPES)
+            total_items = 0
+
+            if not df_items.empty:
+                df_items = df_items.drop_duplicates(subset=_ITEM_KEYS, keep='last')
+                CSVStore.upsert(df_items, CSV_CADRI_ITEMS, keys=_ITEM_KEYS)
+                total_items = len(df_items)
+
+            staging.unlink()
         return total_items
 
 
@@ -259,25 +362,22 @@ class PDFTableExtractor:
         all_tables = []
 
         try:
-            doc = fitz.open(pdf_path)
-
-            for page in doc:
-                # Find tables on page
-                tabs = page.find_tables()
-
-                for tab in tabs:
-                    # Extract table data
-                    table_data = []
-                    for row in tab.extract():
-                        # Clean row data
-                        clean_row = [cell.strip() if cell else '' for cell in row]
-                        if any(clean_row):  # Skip empty rows
-                            table_data.append(clean_row)
-
-                    if table_data:
-                        all_tables.append(table_data)
-
-            doc.close()
+            with fitz.open(pdf_path) as doc:
+                for page in doc:
+                    # Find tables on page
+                    tabs = page.find_tables()
+
+                    for tab in tabs:
+                        # Extract table data
+                        table_data = []
+                        for row in tab.extract():
+                            # Clean row data
+                            clean_row = [cell.strip() if cell else '' for cell in row]
+                            if any(clean_row):  # Skip empty rows
+                                table_data.append(clean_row)
+
+                        if table_data:
+                            all_tables.append(table_data)
 
         except Exception as e:
             logger.error(f"Error extracting tables from {pdf_path}: {e}")
@@ -4,10 +4,39 @@ PDF URL Builder - Constrói URLs de PDFs baseado no padrão descoberto
 
 from typing import Optional, Tuple
 from datetime import datetime
+from functools import lru_cache
 import re
 from urllib.parse import urlparse, parse_qs
 
 
+# Datas com separador; os formatos aceitos são decididos pela largura dos grupos
+_DATE_RE = re.compile(r'^(\d{1,4})([-/])(\d{1,2})\2(\d{1,4})$')
+
+# Data já no formato DDMMAAAA
+_DDMMYYYY_RE = re.compile(r'^\d{8}$')
+
+# Tipos de documento conhecidos -> idocmn padrão (em ordem de prioridade)
+_TIPO_MAP = {
+    'CADRI': '12',
+    'CERTIFICADO': '27',
+    'LICENCA': '15',
+    'DOCUMENTO': '12',  # Padrão para tipo genérico
+}
+_TIPO_RE = re.compile('|'.join(map(re.escape, _TIPO_MAP)))
+
+
+def _query_params(url: str) -> Optional[dict]:
+    """Parâmetros da query string, ou None se a URL não for uma string válida"""
+    if not isinstance(url, str):
+        return None
+    try:
+        query = urlparse(url).query
+    except ValueError:  # ex.: host IPv6 com colchetes malformados
+        return None
+    return parse_qs(query)
+
+
+@lru_cache(maxsize=4096)
 def extract_idocmn_from_url(url: str) -> Optional[str]:
     """
     Extrai o parâmetro idocmn de uma URL de autenticidade
@@ -18,12 +47,10 @@ def extract_idocmn_from_url(url: str) -> Optional[str]:
     Returns:
         idocmn ou None se não encontrado
     """
-    try:
-        parsed = urlparse(url)
-        params = parse_qs(parsed.query)
-        return params.get('idocmn', [None])[0]
-    except:
+    params = _query_params(url)
+    if params is None:
         return None
+    return params.get('idocmn', [None])[0]
 
 
 def format_date_to_ddmmyyyy(date_str: str) -> Optional[str]:
@@ -42,29 +69,58 @@ def format_date_to_ddmmyyyy(date_str: str) -> Optional[str]:
     # Remover espaços
     date_str = date_str.strip()
 
-    # Tentar diferentes formatos
-    formats = [
-        ('%d/%m/%Y', '%d%m%Y'),  # DD/MM/AAAA
-        ('%d-%m-%Y', '%d%m%Y'),  # DD-MM-AAAA
-        ('%Y-%m-%d', '%d%m%Y'),  # AAAA-MM-DD
-        ('%d/%m/%y', '%d%m%Y'),  # DD/MM/AA (2 dígitos)
-        ('%d-%m-%y', '%d%m%Y'),  # DD-MM-AA (2 dígitos)
-    ]
+    # DD/MM/AAAA, DD-MM-AAAA, AAAA-MM-DD, DD/MM/AA ou DD-MM-AA (mesmo separador nos dois lugares)
+    match = _DATE_RE.match(date_str)
+    if match:
+        first, sep, month, last = match.groups()
+
+        if len(first) == 4:
+            # AAAA-MM-DD (só com hífen)
+            if sep != '-' or len(last) > 2:
+                return None
+            year, day = int(first), int(last)
+        elif len(first) <= 2 and len(last) in (2, 4):
+            day, year = int(first), int(last)
+            if len(last) == 2:
+                # Mesmo pivô do %y: 69-99 -> 19xx, 00-68 -> 20xx
+                year += 1900 if year >= 69 else 2000
+        else:
+            return None
 
-    for input_fmt, output_fmt in formats:
         try:
-            date_obj = datetime.strptime(date_str, input_fmt)
-            return date_obj.strftime(output_fmt)
+            datetime(year, int(month), day)  # valida dia/mês
         except ValueError:
-            continue
+            return None
+        return f"{day:02d}{int(month):02d}{year:04d}"
 
     # Se já estiver no formato DDMMAAAA
-    if re.match(r'^\d{8}$', date_str):
+    if _DDMMYYYY_RE.match(date_str):
         return date_str
 
     return None
 
 
+def _pdf_url_parts(idocmn: str, ndocmn: str, data_emissao: str) -> Optional[Tuple[str, str]]:
+    """
+    Partes da URL que não dependem da versão: (prefixo até o ndocmn, sufixo com data e .pdf)
+
+    Returns:
+        Tupla (prefixo, sufixo) ou None se dados inválidos
+    """
+    # Validar entradas
+    if not all([idocmn, ndocmn, data_emissao]):
+        return None
+
+    # Formatar data
+    data_formatted = format_date_to_ddmmyyyy(data_emissao)
+    if not data_formatted:
+        return None
+
+    # Limpar números (remover espaços, zeros à esquerda desnecessários)
+    prefix = f"https://autenticidade.cetesb.sp.gov.br/pdf/{idocmn.strip()}{ndocmn.strip().zfill(8)}"
+    return prefix, f"{data_formatted}.pdf"
+
+
 def build_pdf_url(
     idocmn: str,
     ndocmn: str,
@@ -89,25 +145,12 @@ def build_pdf_url(
         >>> build_pdf_url("27", "16000520", "09/11/2010", "01")
         'https://autenticidade.cetesb.sp.gov.br/pdf/27160005200109112010.pdf'
     """
-    # Validar entradas
-    if not all([idocmn, ndocmn, data_emissao]):
-        return None
-
-    # Formatar data
-    data_formatted = format_date_to_ddmmyyyy(data_emissao)
-    if not data_formatted:
+    parts = _pdf_url_parts(idocmn, ndocmn, data_emissao)
+    if not parts:
         return None
 
-    # Limpar números (remover espaços, zeros à esquerda desnecessários)
-    idocmn = idocmn.strip()
-    ndocmn = ndocmn.strip()
-    versao = versao.strip()
-
-    # Construir código
-    codigo = f"{idocmn}{ndocmn.zfill(8)}{versao}{data_formatted}"
-
-    # Retornar URL
-    return f"https://autenticidade.cetesb.sp.gov.br/pdf/{codigo}.pdf"
+    prefix, suffix = parts
+    return f"{prefix}{versao.strip()}{suffix}"
 
 
 def build_pdf_url_with_fallback(
@@ -128,17 +171,16 @@ def build_pdf_url_with_fallback(
     Returns:
         Lista de URLs para tentar em ordem
     """
-    urls = []
-
-    for version in range(1, max_version + 1):
-        versao_str = str(version).zfill(2)  # 01, 02, 03...
-        url = build_pdf_url(idocmn, ndocmn, data_emissao, versao_str)
-        if url:
-            urls.append(url)
+    # Validação e formatação uma única vez; só a versão (01, 02, 03...) varia
+    parts = _pdf_url_parts(idocmn, ndocmn, data_emissao)
+    if not parts:
+        return []
 
-    return urls
+    prefix, suffix = parts
+    return [f"{prefix}{version:02d}{suffix}" for version in range(1, max_version + 1)]
 
 
+@lru_cache(maxsize=4096)
 def parse_autenticidade_url(url: str) -> Optional[Tuple[str, str]]:
     """
     Extrai idocmn e ndocmn de uma URL de autenticidade
@@ -149,17 +191,15 @@ def parse_autenticidade_url(url: str) -> Optional[Tuple[str, str]]:
     Returns:
         Tupla (idocmn, ndocmn) ou None
     """
-    try:
-        parsed = urlparse(url)
-        params = parse_qs(parsed.query)
+    params = _query_params(url)
+    if params is None:
+        return None
 
-        idocmn = params.get('idocmn', [None])[0]
-        ndocmn = params.get('ndocmn', [None])[0]
+    idocmn = params.get('idocmn', [None])[0]
+    ndocmn = params.get('ndocmn', [None])[0]
 
-        if idocmn and ndocmn:
-            return (idocmn, ndocmn)
-    except:
-        pass
+    if idocmn and ndocmn:
+        return (idocmn, ndocmn)
 
     return None
 
@@ -174,20 +214,13 @@ def get_default_idocmn(tipo_documento: str) -> str:
     Returns:
         idocmn padrão
     """
-    # Mapear tipos conhecidos
-    tipo_map = {
-        'CADRI': '12',
-        'CERTIFICADO': '27',
-        'LICENCA': '15',
-        'DOCUMENTO': '12',  # Padrão para tipo genérico
-    }
-
     # Normalizar tipo
     tipo_upper = tipo_documento.upper() if tipo_documento else 'DOCUMENTO'
 
-    # Buscar no mapa
-    for key, value in tipo_map.items():
-        if key in tipo_upper:
+    # Uma única busca; se houver mais de um tipo no texto, vale a ordem do mapa
+    found = set(_TIPO_RE.findall(tipo_upper))
+    for key, value in _TIPO_MAP.items():
+        if key in found:
             return value
 
     # Padrão
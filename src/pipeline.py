@@ -11,15 +11,31 @@ Main orchestrator for complete data collection:
 
 import asyncio
 import argparse
+import csv
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 import signal
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from config import CSV_DIR, RESUME_ENABLED, CHECKPOINT_INTERVAL
+# Project root (PDF downloaders and parsers live there), added once here
+# rather than on every stage call
+_PROJECT_ROOT = str(Path(__file__).parent.parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
+
+from config import (
+    CSV_DIR, RESUME_ENABLED, CHECKPOINT_INTERVAL, CHECKPOINT_MIN_SECONDS, LIST_CONCURRENCY,
+    DETAIL_CONCURRENCY
+)
 from store_csv import CSVSchemas, CSVStore
 from seeds import SeedManager, AdaptiveSearchStrategy
 from scrape_list import ListScraper
@@ -27,6 +43,13 @@ from scrape_detail import DetailScraper
 from logging_conf import logger, metrics, setup_logging
 
 
+# URLs handled by one DetailScraper in stage_detail
+DETAIL_CHUNK_SIZE = 50
+
+# Seconds between parse passes while PDFs are still downloading
+PARSE_POLL_SECONDS = 60
+
+
 class Pipeline:
     """Main pipeline orchestrator"""
 
@@ -35,31 +58,108 @@ class Pipeline:
         self.seed_manager = SeedManager()
         self.adaptive_strategy = AdaptiveSearchStrategy(self.seed_manager)
         self.checkpoint_counter = 0
+        self._save_due = False
+        self._last_save_ts = float('-inf')  # the first due save is not delayed
+        self._checkpoint_lock = threading.Lock()
         self.running = True
-
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
+        self._loop = None
+        self._search_tasks = []  # stage_list searches, cancelled on shutdown
+        # Idle DetailScrapers, kept between chunks and iterations so their
+        # HTTP connections stay alive; closed by close()
+        self._detail_scrapers = queue.SimpleQueue()
+        # PDF parsers by kind, kept between stage_parse calls so the passes
+        # during downloads neither reload models nor retry documents
+        self._parsers = {}
+
+        # Setup signal handlers for graceful shutdown (only possible in the
+        # main thread; embedded pipelines are stopped by setting running)
+        if threading.current_thread() is threading.main_thread():
+            try:
+                signal.signal(signal.SIGINT, self._signal_handler)
+                signal.signal(signal.SIGTERM, self._signal_handler)
+            except (ValueError, OSError) as e:
+                logger.debug(f"Could not install signal handlers: {e}")
+        else:
+            logger.debug("Not in the main thread, skipping signal handlers")
 
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         logger.info("Received shutdown signal, stopping gracefully...")
         self.running = False
 
+        # Abort searches in flight instead of waiting for their pages to load
+        if self._search_tasks and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._cancel_searches)
+
+    def close(self):
+        """Close the pooled detail scrapers and their HTTP clients"""
+        while True:
+            try:
+                scraper = self._detail_scrapers.get_nowait()
+            except queue.Empty:
+                break
+            scraper.__exit__(None, None, None)
+
+    def _parser(self, kind: str, factory):
+        """The stage_parse parser of this kind, created on first use"""
+        parser = self._parsers.get(kind)
+        if parser is None:
+            parser = self._parsers[kind] = factory()
+        return parser
+
+    def _scrape_detail_chunk(self, urls: list) -> int:
+        """Scrape one chunk of detail URLs with a pooled scraper; returns documents found"""
+        try:
+            scraper = self._detail_scrapers.get_nowait()
+        except queue.Empty:
+            scraper = DetailScraper()
+
+        try:
+            return scraper.process_url_list(urls)
+        finally:
+            self._detail_scrapers.put(scraper)
+
+    def _cancel_searches(self):
+        """Cancel the running stage_list searches (runs on the event loop)"""
+        for task in self._search_tasks:
+            task.cancel()
+
     def checkpoint(self):
         """Save checkpoint for resume capability"""
+        # Stages may run in worker threads (detail scraping, parsing)
+        with self._checkpoint_lock:
+            self._checkpoint()
+
+    def _checkpoint(self):
         self.checkpoint_counter += 1
 
         if self.checkpoint_counter % CHECKPOINT_INTERVAL == 0:
-            self.seed_manager.save_state()
-            logger.info(f"Checkpoint saved at {self.checkpoint_counter} operations")
+            self._save_due = True
+
+        # A due save waits until CHECKPOINT_MIN_SECONDS have passed since the last one
+        if self._save_due and time.monotonic() - self._last_save_ts >= CHECKPOINT_MIN_SECONDS:
+            self._save_checkpoint()
+
+    def flush_checkpoint(self):
+        """Save a checkpoint still waiting on CHECKPOINT_MIN_SECONDS (end of a stage or run)"""
+        with self._checkpoint_lock:
+            if self._save_due:
+                self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        self.seed_manager.save_state()
+        self._save_due = False
+        self._last_save_ts = time.monotonic()
+        logger.info(f"Checkpoint saved at {self.checkpoint_counter} operations")
 
     async def stage_list(self, seeds: list = None, cnpjs: list = None, max_seeds: int = 10):
         """Stage 1: Search for companies and get detail page URLs"""
         logger.info("=== Starting Stage 1: List Scraping ===")
 
-        scraper = ListScraper(self.seed_manager)
         all_urls = []
+        enhanced_count = 0  # URLs with complete data (no detail stage needed)
+        seen_urls = set()
+        duplicate_count = 0
 
         if cnpjs:
             # Use CNPJ list (priority over seeds)
@@ -80,22 +180,53 @@ class Pipeline:
             logger.warning("No search terms available")
             return []
 
-        for search_term in search_list:
-            if not self.running:
-                break
+        # Searches are independent, so run up to LIST_CONCURRENCY at once.
+        # Each search gets its own ListScraper: the scraper's BrowserManager
+        # is started and closed per search and cannot be shared between
+        # concurrent searches
+        sem = asyncio.Semaphore(max(1, LIST_CONCURRENCY))
+
+        async def run(search_term):
+            async with sem:
+                if not self.running:
+                    return None
+                term_scraper = ListScraper(self.seed_manager)
+                if search_method == 'cnpj':
+                    results = await term_scraper.search_by_cnpj(search_term)
+                else:
+                    results = await term_scraper.search_by_razao_social(search_term)
+                # Plain URL strings become dicts here, so everything after gets dicts
+                return [r if isinstance(r, dict) else {'url': r} for r in results]
 
-            if search_method == 'cnpj':
-                results = await scraper.search_by_cnpj(search_term)
-            else:
-                results = await scraper.search_by_razao_social(search_term)
+        # Searches in flight are cancelled on shutdown (see _signal_handler);
+        # the TaskGroup treats a cancelled search as finished without results
+        self._loop = asyncio.get_running_loop()
+        try:
+            async with asyncio.TaskGroup() as tg:
+                self._search_tasks = [tg.create_task(run(term)) for term in search_list]
+        finally:
+            tasks, self._search_tasks = self._search_tasks, []
+
+        results_list = [None if task.cancelled() else task.result() for task in tasks]
+
+        for search_term, results in zip(search_list, results_list):
+            if results is None:  # stopped before or during this search
+                continue
 
             # Store original results for CSV (with metadata)
             # But extract URLs for detail scraping pipeline
             for r in results:
-                if isinstance(r, dict):
-                    all_urls.append(r)  # Keep full dict for CSV
-                else:
-                    all_urls.append({'url': r})  # Convert string to dict for CSV
+                # Seeds often hit the same companies; keep the first hit only.
+                # The query string identifies the company, so it stays in the key
+                key = (r.get('url') or '').rstrip('/')
+                if key in seen_urls:
+                    duplicate_count += 1
+                    continue
+                seen_urls.add(key)
+
+                all_urls.append(r)  # Keep full dict for CSV
+                if r.get('skip_detail_stage'):
+                    enhanced_count += 1
 
             # Log performance for adaptive strategy (only for seeds)
             if search_method == 'seed':
@@ -108,88 +239,119 @@ class Pipeline:
         # Save URLs for next stage with optimization info
         if all_urls:
             urls_file = CSV_DIR / "pending_urls.csv"
-            import pandas as pd
 
-            # Convert to DataFrame with additional fields for optimization
-            urls_data = []
-            for url_info in all_urls:
-                if isinstance(url_info, dict):
-                    urls_data.append(url_info)
-                else:
-                    # Convert string URL to dict
-                    urls_data.append({'url': url_info})
-
-            df_urls = pd.DataFrame(urls_data)
+            # Header is the union of keys in first-seen order (like a DataFrame
+            # built from these dicts), with 'url' always present
+            columns = list(dict.fromkeys(key for url_info in all_urls for key in url_info))
+            if 'url' not in columns:
+                columns.append('url')
 
-            # Ensure required columns exist
-            if 'url' not in df_urls.columns:
-                df_urls['url'] = df_urls.get('url', '')
+            with open(urls_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=columns, lineterminator='\n')
+                writer.writeheader()
+                writer.writerows(all_urls)
 
-            df_urls.to_csv(urls_file, index=False)
-
-            enhanced_count = len([u for u in urls_data if u.get('skip_detail_stage')])
             logger.info(f"Saved {len(all_urls)} URLs for processing")
+            if duplicate_count > 0:
+                logger.info(f"  - {duplicate_count} duplicate URLs dropped")
             if enhanced_count > 0:
                 logger.info(f"  - {enhanced_count} URLs have complete data (will skip detail stage)")
                 logger.info(f"  - {len(all_urls) - enhanced_count} URLs need detail scraping")
 
         return all_urls
 
-    def stage_detail(self, urls: list = None):
-        """Stage 2: Scrape detail pages for CADRI documents (optimized)"""
+    def stage_detail(self, urls: list = None, checkpoint: bool = True):
+        """
+        Stage 2: Scrape detail pages for CADRI documents (optimized)
+
+        urls is stage_list's result (dicts) or plain URL strings; when None,
+        the URLs are loaded from pending_urls.csv.
+        """
         logger.info("=== Starting Stage 2: Detail Scraping (Optimized) ===")
 
         if urls is None:
             # Load from saved file
             urls_file = CSV_DIR / "pending_urls.csv"
             if urls_file.exists():
-                import pandas as pd
-                df = pd.read_csv(urls_file)
+                # Only the two columns used here, with their types given up front
+                df = pd.read_csv(
+                    urls_file,
+                    usecols=lambda col: col in ('url', 'skip_detail_stage'),
+                    dtype={'url': str, 'skip_detail_stage': 'boolean'}
+                )
 
                 # Check if we have enhanced extraction results
                 if 'skip_detail_stage' in df.columns:
                     # Filter URLs that need detail scraping
-                    urls_to_process = df[df.get('skip_detail_stage', False) != True]['url'].tolist()
+                    # Read as nullable 'boolean', so filling NA leaves a plain mask
+                    skip_mask = df['skip_detail_stage'].fillna(False)
+                    urls_to_process = df.loc[~skip_mask, 'url'].tolist()
                     skipped_count = len(df) - len(urls_to_process)
 
                     if skipped_count > 0:
                         logger.info(f"Skipping {skipped_count} URLs that already have complete data")
 
-                    urls = urls_to_process
+                    url_strings = urls_to_process
                 else:
-                    urls = df['url'].tolist()
+                    url_strings = df['url'].tolist()
             else:
                 logger.warning("No URLs to process")
                 return 0
+        elif urls and isinstance(urls[0], dict):
+            # stage_list results: dicts that all carry a 'url' key
+            url_strings = [url_item['url'] for url_item in urls]
+        else:
+            url_strings = list(urls)
 
-        if not urls:
+        if not url_strings:
             logger.info("All URLs already processed with enhanced extraction - skipping detail stage")
             return 0
 
-        logger.info(f"Processing {len(urls)} URLs that need detail scraping")
-
-        # Extract URL strings from dicts if needed (for CNPJ search results)
-        url_strings = []
-        for url_item in urls:
-            if isinstance(url_item, dict):
-                url_strings.append(url_item.get('url', url_item))
-            else:
-                url_strings.append(url_item)
+        logger.info(f"Processing {len(url_strings)} URLs that need detail scraping")
+
+        # Drop repeated URLs, keeping order
+        unique_urls = list(dict.fromkeys(url_strings))
+        if len(unique_urls) < len(url_strings):
+            logger.info(f"Dropped {len(url_strings) - len(unique_urls)} duplicate URLs")
+            url_strings = unique_urls
+
+        # Detail pages are fetched with blocking httpx calls, so chunks of
+        # URLs are scraped in parallel threads; each running chunk holds its
+        # own DetailScraper (and HTTP client) from the pool
+        chunks = [
+            url_strings[i:i + DETAIL_CHUNK_SIZE]
+            for i in range(0, len(url_strings), DETAIL_CHUNK_SIZE)
+        ]
+        workers = max(1, min(DETAIL_CONCURRENCY, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            total_docs = sum(executor.map(self._scrape_detail_chunk, chunks))
+
+        if checkpoint:
+            self.checkpoint()
+        return total_docs
 
-        with DetailScraper() as scraper:
-            total_docs = scraper.process_url_list(url_strings)
+    async def _stage_detail_async(self, urls: list, iteration: int) -> int:
+        """
+        Run stage_detail in a worker thread so the event loop stays free
 
+        The checkpoint is taken back on the event loop, where stage_list
+        also updates the seed manager.
+        """
+        docs = await asyncio.to_thread(self.stage_detail, urls, False)
         self.checkpoint()
-        return total_docs
+
+        # Show metrics
+        logger.info(f"\nIteration {iteration} complete:")
+        logger.info(f"  URLs found: {len(urls)}")
+        logger.info(f"  Documents found: {docs}")
+        logger.info(f"  {metrics.get_summary()}")
+        return docs
 
     async def stage_pdf(self, doc_type: str = None):
         """Stage 3: Download PDFs using direct method with interactive fallback"""
         logger.info("=== Starting Stage 3: PDF Download ===")
 
-        # Import PDF downloaders
-        from pathlib import Path
-        sys.path.append(str(Path(__file__).parent.parent))
-
+        # Import PDF downloaders (imported on first use only)
         try:
             from cert_mov_direct_downloader import CertMovDirectDownloader
             from interactive_pdf_downloader import InteractivePDFDownloader
@@ -237,21 +399,15 @@ class Pipeline:
         """
         logger.info("=== Starting Stage 4: PDF Parsing ===")
 
-        # Import PDF parser
-        from pathlib import Path
-        sys.path.append(str(Path(__file__).parent.parent))
-
         stats = {"parsed": 0, "failed": 0}
 
         # LLM parser option
         if parser_method == "llm":
             try:
-                # Adicionar src ao path para garantir imports corretos
-                sys.path.insert(0, str(Path(__file__).parent))
                 from llm_pdf_parser import LLMPDFParser
                 logger.info("Using LLM structured output parser")
 
-                parser = LLMPDFParser()
+                parser = self._parser("llm", LLMPDFParser)
                 stats = parser.parse_all_pdfs(force_reparse=force_reparse)
                 logger.info(f"LLM parsing stats: {stats}")
                 self.checkpoint()
@@ -264,12 +420,10 @@ class Pipeline:
         # Hybrid parser (LLM with fallback)
         elif parser_method == "hybrid":
             try:
-                # Adicionar src ao path para garantir imports corretos
-                sys.path.insert(0, str(Path(__file__).parent))
                 from llm_pdf_parser import LLMPDFParser
                 logger.info("Using hybrid parser (LLM + fallback)")
 
-                parser = LLMPDFParser()
+                parser = self._parser("llm", LLMPDFParser)
                 stats = parser.parse_all_pdfs(force_reparse=force_reparse)
                 logger.info(f"Hybrid parsing stats: {stats}")
                 self.checkpoint()
@@ -286,7 +440,7 @@ class Pipeline:
 
                 if DOCLING_AVAILABLE:
                     logger.info("Using enhanced Docling parser")
-                    parser = DoclingPDFParser()
+                    parser = self._parser("docling", DoclingPDFParser)
                     stats = parser.parse_all_pdfs(force_reparse=force_reparse)
                     logger.info(f"Docling parsing stats: {stats}")
                     self.checkpoint()
@@ -308,8 +462,8 @@ class Pipeline:
             from pdf_parser_standalone import PDFParser
             logger.info("Using standard PyMuPDF regex parser")
 
-            with PDFParser() as parser:
-                stats = parser.parse_all_pdfs(force_reparse=force_reparse)
+            parser = self._parser("regex", PDFParser)
+            stats = parser.parse_all_pdfs(force_reparse=force_reparse)
 
         except ImportError as e:
             logger.error(f"Could not import PDF parser: {e}")
@@ -332,6 +486,10 @@ class Pipeline:
             logger.info(f"Running in CNPJ mode with {len(cnpjs)} CNPJs")
             max_iterations = 1
 
+        # Detail scraping of iteration N runs in a worker thread while
+        # iteration N+1 lists companies on the event loop
+        detail_task = None
+
         for iteration in range(1, max_iterations + 1):
             if not self.running:
                 break
@@ -346,31 +504,48 @@ class Pipeline:
                 # Use regular seed-based approach
                 urls = await self.stage_list()
 
+            # Previous iteration's detail results decide whether to go on
+            if detail_task:
+                docs = await detail_task
+                detail_task = None
+                total_docs += docs
+
+                if docs == 0:
+                    logger.info("No new documents found, stopping")
+                    # This iteration's list already ran (its seeds are marked
+                    # used and pending_urls.csv holds its URLs), so scrape
+                    # them before stopping rather than orphaning them
+                    if urls:
+                        total_docs += await self._stage_detail_async(urls, iteration)
+                    break
+
             if not urls:
                 logger.info("No more URLs found, stopping")
                 break
 
-            # Stage 2: Detail scraping
-            docs = self.stage_detail(urls)
-            total_docs += docs
+            # Stage 2: Detail scraping (awaited during the next iteration)
+            detail_task = asyncio.create_task(self._stage_detail_async(urls, iteration))
 
-            # Show metrics
-            logger.info(f"\nIteration {iteration} complete:")
-            logger.info(f"  URLs found: {len(urls)}")
-            logger.info(f"  Documents found: {docs}")
-            logger.info(f"  {metrics.get_summary()}")
-
-            # Check if we should continue
-            if docs == 0:
-                logger.info("No new documents found, stopping")
-                break
+        if detail_task:
+            total_docs += await detail_task
 
         # Stage 3: PDF Download (after all data collection)
         if total_docs > 0:
             logger.info("\n=== Starting PDF Download Stage ===")
-            pdf_stats = await self.stage_pdf()
 
-            # Stage 4: PDF Parsing (after downloads)
+            # Stage 4 overlaps with downloads: a worker thread parses the PDFs
+            # already on disk in passes until the downloads finish
+            downloads_done = threading.Event()
+            parse_thread = asyncio.create_task(
+                asyncio.to_thread(self._parse_during_downloads, downloads_done, parser_method)
+            )
+            try:
+                pdf_stats = await self.stage_pdf()
+            finally:
+                downloads_done.set()
+                await parse_thread
+
+            # Final pass for the PDFs downloaded since the last one
             logger.info("\n=== Starting PDF Parsing Stage ===")
             parse_stats = self.stage_parse(parser_method=parser_method)
 
@@ -379,6 +554,8 @@ class Pipeline:
             logger.info(f"PDF downloads: {pdf_stats}")
             logger.info(f"PDF parsing: {parse_stats}")
 
+        self.flush_checkpoint()
+
         logger.info("\n📊 Pipeline completed successfully!")
         logger.info("📁 Results saved in:")
         logger.info("   - data/csv/empresas.csv (company data)")
@@ -386,34 +563,52 @@ class Pipeline:
         logger.info("   - data/csv/cadri_itens.csv (waste item details)")
         logger.info("   - data/pdf/ (downloaded PDFs)")
 
+    def _parse_during_downloads(self, downloads_done: threading.Event, parser_method: str):
+        """
+        Parse the PDFs on disk every PARSE_POLL_SECONDS until downloads_done is set
+
+        Every pass reuses the same parser, which skips PDFs it already
+        attempted, and downloaders only rename a PDF into place once it is
+        complete, so each pass picks up just the new files.
+        """
+        while not downloads_done.wait(PARSE_POLL_SECONDS):
+            try:
+                self.stage_parse(parser_method=parser_method)
+            except Exception as e:
+                logger.error(f"Error parsing PDFs during downloads: {e}")
+
     async def run_stage(self, stage: str, parser_method: str = "auto", **kwargs):
         """Run a specific stage"""
         CSVSchemas.init_all()
 
-        if stage == 'list':
-            seeds = kwargs.get('seeds', [])
-            cnpjs = kwargs.get('cnpjs', [])
-            if isinstance(seeds, str):
-                seeds = [s.strip() for s in seeds.split(',')]
-            await self.stage_list(seeds=seeds, cnpjs=cnpjs)
+        try:
+            if stage == 'list':
+                seeds = kwargs.get('seeds', [])
+                cnpjs = kwargs.get('cnpjs', [])
+                if isinstance(seeds, str):
+                    seeds = [s.strip() for s in seeds.split(',')]
+                await self.stage_list(seeds=seeds, cnpjs=cnpjs)
 
-        elif stage == 'detail':
-            self.stage_detail()
+            elif stage == 'detail':
+                self.stage_detail()
 
-        elif stage == 'pdf':
-            await self.stage_pdf()
+            elif stage == 'pdf':
+                await self.stage_pdf()
 
-        elif stage == 'parse':
-            self.stage_parse(parser_method=parser_method)
+            elif stage == 'parse':
+                self.stage_parse(parser_method=parser_method)
 
-        elif stage == 'all':
-            max_iter = kwargs.get('max_iterations', 5)
-            cnpjs = kwargs.get('cnpjs', [])
-            await self.run_all(max_iter, cnpjs=cnpjs, parser_method=parser_method)
+            elif stage == 'all':
+                max_iter = kwargs.get('max_iterations', 5)
+                cnpjs = kwargs.get('cnpjs', [])
+                await self.run_all(max_iter, cnpjs=cnpjs, parser_method=parser_method)
 
-        else:
-            logger.error(f"Unknown stage: {stage}")
-            sys.exit(1)
+            else:
+                logger.error(f"Unknown stage: {stage}")
+                sys.exit(1)
+        finally:
+            # Deferred checkpoint saves must not be lost when the stage ends
+            self.flush_checkpoint()
 
 
 def main():
@@ -531,6 +726,8 @@ def main():
     except Exception as e:
         logger.error(f"Pipeline error: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        pipeline.close()
 
     print("\n" + "="*60)
     print(f"Finished: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -2,11 +2,17 @@
 Pydantic schemas for CADRI data extraction using LLM structured outputs
 """
 
+import re
 from typing import List, Optional, Union
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator, model_validator
 from datetime import datetime
 
 
+# Timestamps malformados comuns nas respostas do LLM
+_DT_DOUBLE_COLON_RE = re.compile(r'T(\d{1,2})::(\d{2})')
+_DT_NO_SECONDS_RE = re.compile(r'T(\d{1,2}):(\d{2})$')
+
+
 class EntidadeGeradora(BaseModel):
     """Dados da entidade geradora de resíduos"""
     nome: Optional[str] = Field(None, description="Razão social da entidade geradora")
@@ -99,7 +105,39 @@ class CADRIExtractionResult(BaseModel):
     extraction_method: str = Field(default="llm", description="Método de extração usado")
     processed_at: Optional[datetime] = Field(default_factory=datetime.now, description="Timestamp do processamento")
 
-    @validator('processed_at', pre=True, always=True)
+    model_config = ConfigDict(validate_default=True)
+
+    @model_validator(mode='before')
+    @classmethod
+    def fill_document_defaults(cls, data, info: ValidationInfo):
+        """
+        Completa a estrutura mínima da resposta do LLM antes da validação
+
+        O número do documento vem de context={'numero_documento': ...} e é
+        usado no resultado e em cada item que não o informe.
+        """
+        if not isinstance(data, dict):
+            return data
+
+        numero_documento = (info.context or {}).get('numero_documento')
+        if numero_documento is not None:
+            data.setdefault('numero_documento', numero_documento)
+
+        if 'items' not in data:
+            data['items'] = []
+            data['total_items'] = 0
+        elif 'total_items' not in data and isinstance(data['items'], list):
+            data['total_items'] = len(data['items'])
+
+        if numero_documento is not None and isinstance(data['items'], list):
+            for item in data['items']:
+                if isinstance(item, dict):
+                    item.setdefault('numero_documento', numero_documento)
+
+        return data
+
+    @field_validator('processed_at', mode='before')
+    @classmethod
     def validate_processed_at(cls, v):
         """Validator for processed_at with fallback to current datetime"""
         if v is None:
@@ -108,11 +146,10 @@ class CADRIExtractionResult(BaseModel):
             return v
         if isinstance(v, str):
             # Try to fix common datetime format issues
-            import re
             # Fix double colons: T12::00 -> T12:00:00
-            v = re.sub(r'T(\d{1,2})::(\d{2})', r'T\1:\2:00', v)
+            v = _DT_DOUBLE_COLON_RE.sub(r'T\1:\2:00', v)
             # Add seconds if missing: T12:00 -> T12:00:00
-            v = re.sub(r'T(\d{1,2}):(\d{2})$', r'T\1:\2:00', v)
+            v = _DT_NO_SECONDS_RE.sub(r'T\1:\2:00', v)
             try:
                 return datetime.fromisoformat(v.replace('Z', '+00:00'))
             except ValueError:
@@ -120,12 +157,6 @@ class CADRIExtractionResult(BaseModel):
                 return datetime.now()
         return datetime.now()
 
-    class Config:
-        """Configuração do modelo Pydantic"""
-        json_encoders = {
-            datetime: lambda dt: dt.isoformat()
-        }
-
 
 def flatten_item_to_dict(item: ItemResiduoCADRI) -> dict:
     """
@@ -1,6 +1,9 @@
+import csv
+import os
 import string
 from typing import List, Set, Optional
 from collections import deque
+from itertools import zip_longest
 import pandas as pd
 from pathlib import Path
 
@@ -47,24 +50,19 @@ class SeedManager:
                 logger.warning(f"Could not load seed state: {e}")
 
     def save_state(self):
-        """Save current state to CSV"""
+        """Save current state to CSV (one column per collection, padded with blanks)"""
         state_file = CSV_DIR / "seed_state.csv"
+        tmp_file = state_file.with_suffix('.csv.tmp')
 
-        # Create DataFrame with max length
-        max_len = max(
-            len(self.used_seeds),
-            len(self.seed_queue),
-            len(self.discovered_trigrams)
-        )
-
-        data = {
-            'used_seeds': list(self.used_seeds) + [None] * (max_len - len(self.used_seeds)),
-            'queued_seeds': list(self.seed_queue) + [None] * (max_len - len(self.seed_queue)),
-            'discovered': list(self.discovered_trigrams) + [None] * (max_len - len(self.discovered_trigrams))
-        }
-
-        df = pd.DataFrame(data)
-        df.to_csv(state_file, index=False)
+        rows = zip_longest(self.used_seeds, self.seed_queue, self.discovered_trigrams, fillvalue='')
+
+        # Written with the csv module (no DataFrame) to a temp file, then
+        # swapped in so a crash mid-save never leaves a truncated state file
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['used_seeds', 'queued_seeds', 'discovered'])
+            writer.writerows(rows)
+        os.replace(tmp_file, state_file)
         logger.debug("Saved seed state")
 
     def is_valid_seed(self, seed: str) -> bool:
@@ -1,3 +1,5 @@
+import csv
+import threading
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -9,20 +11,29 @@ from logging_conf import logger
 class CSVStore:
     """CSV storage manager with idempotent upsert operations"""
 
+    # Held by every read-modify-write of a CSV (reentrant, so writers may nest)
+    write_lock = threading.RLock()
+
     @staticmethod
     def ensure_csv(file_path: Path, columns: List[str]) -> None:
         """Ensure CSV exists with proper headers"""
-        if not file_path.exists():
-            df = pd.DataFrame(columns=columns)
-            df.to_csv(file_path, index=False, encoding='utf-8')
-            logger.info(f"Created CSV: {file_path}")
+        with CSVStore.write_lock:
+            if not file_path.exists():
+                df = pd.DataFrame(columns=columns)
+                df.to_csv(file_path, index=False, encoding='utf-8')
+                logger.info(f"Created CSV: {file_path}")
 
     @staticmethod
-    def load_csv(file_path: Path) -> pd.DataFrame:
-        """Load CSV file, return empty DataFrame if not exists"""
+    def load_csv(file_path: Path, dtype: Any = str) -> pd.DataFrame:
+        """
+        Load CSV file, return empty DataFrame if not exists
+
+        dtype defaults to str for every column; pass a per-column mapping
+        (e.g. 'category' for low-cardinality columns) to narrow large files.
+        """
         if file_path.exists():
             try:
-                return pd.read_csv(file_path, encoding='utf-8', dtype=str)
+                return pd.read_csv(file_path, encoding='utf-8', dtype=dtype)
             except pd.errors.EmptyDataError:
                 return pd.DataFrame()
         return pd.DataFrame()
@@ -49,41 +60,86 @@ class CSVStore:
         if df_new.empty:
             return 0
 
-        # Add timestamp if requested
-        if update_timestamp:
-            df_new['updated_at'] = datetime.now().isoformat()
+        # Load, merge and rewrite as one step: pipeline stages upsert the
+        # same files from different threads
+        with CSVStore.write_lock:
+            # Add timestamp if requested
+            if update_timestamp:
+                df_new['updated_at'] = datetime.now().isoformat()
 
-        # Load existing data
-        df_existing = CSVStore.load_csv(target_csv)
+            # Load existing data
+            df_existing = CSVStore.load_csv(target_csv)
 
-        if df_existing.empty:
-            # First time, just save
-            df_new.to_csv(target_csv, index=False, encoding='utf-8')
-            logger.info(f"Saved {len(df_new)} new records to {target_csv.name}")
-            return len(df_new)
+            if df_existing.empty:
+                # First time, just save
+                df_new.to_csv(target_csv, index=False, encoding='utf-8')
+                logger.info(f"Saved {len(df_new)} new records to {target_csv.name}")
+                return len(df_new)
+
+            # Perform merge (upsert)
+            df_merged = pd.concat([df_existing, df_new], ignore_index=True)
+
+            # Remove duplicates, keeping last (most recent)
+            df_merged = df_merged.drop_duplicates(subset=keys, keep='last')
 
-        # Perform merge (upsert)
-        df_merged = pd.concat([df_existing, df_new], ignore_index=True)
+            # Sort by keys for consistency
+            df_merged = df_merged.sort_values(by=keys)
 
-        # Remove duplicates, keeping last (most recent)
-        df_merged = df_merged.drop_duplicates(subset=keys, keep='last')
+            # Save back
+            df_merged.to_csv(target_csv, index=False, encoding='utf-8')
 
-        # Sort by keys for consistency
-        df_merged = df_merged.sort_values(by=keys)
+            new_count = len(df_merged) - len(df_existing)
+            updated_count = len(df_new) - new_count
 
-        # Save back
-        df_merged.to_csv(target_csv, index=False, encoding='utf-8')
+            logger.info(
+                f"Upserted to {target_csv.name}: "
+                f"{new_count} new, {updated_count} updated"
+            )
 
-        new_count = len(df_merged) - len(df_existing)
-        updated_count = len(df_new) - new_count
+            return len(df_new)
+
+    @staticmethod
+    def append(df_new: pd.DataFrame, target_csv: Path) -> int:
+        """
+        Append records to CSV without reading it (no deduplication)
 
-        logger.info(
-            f"Upserted to {target_csv.name}: "
-            f"{new_count} new, {updated_count} updated"
-        )
+        Meant for staging files that are later folded into the real CSV
+        with a single upsert.
 
+        Returns:
+            Number of records appended
+        """
+        if df_new.empty:
+            return 0
+
+        with CSVStore.write_lock:
+            write_header = not target_csv.exists() or target_csv.stat().st_size == 0
+            df_new.to_csv(target_csv, mode='a', header=write_header, index=False, encoding='utf-8')
         return len(df_new)
 
+    @staticmethod
+    def append_records(records: List[Dict[str, Any]], target_csv: Path, columns: List[str]) -> int:
+        """
+        Append plain dict records to a CSV without building a DataFrame
+
+        Same output as append() for a DataFrame with these columns: keys
+        outside columns are ignored, missing ones are written empty.
+
+        Returns:
+            Number of records appended
+        """
+        if not records:
+            return 0
+
+        with CSVStore.write_lock:
+            write_header = not target_csv.exists() or target_csv.stat().st_size == 0
+            with open(target_csv, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(records)
+        return len(records)
+
     @staticmethod
     def append_if_new(
         record: Dict[str, Any],
@@ -97,19 +153,21 @@ class CSVStore:
             True if record was added, False if already exists
         """
         df_new = pd.DataFrame([record])
-        df_existing = CSVStore.load_csv(target_csv)
 
-        if not df_existing.empty:
-            # Check if record already exists
-            mask = True
-            for key in keys:
-                mask = mask & (df_existing[key] == record.get(key))
+        with CSVStore.write_lock:
+            df_existing = CSVStore.load_csv(target_csv)
+
+            if not df_existing.empty:
+                # Check if record already exists
+                mask = True
+                for key in keys:
+                    mask = mask & (df_existing[key] == record.get(key))
 
-            if mask.any():
-                return False
+                if mask.any():
+                    return False
 
-        # Append new record
-        CSVStore.upsert(df_new, target_csv, keys)
+            # Append new record
+            CSVStore.upsert(df_new, target_csv, keys)
         return True
 
 
@@ -339,17 +397,18 @@ def mark_pdf_status(numero_documento: str, status: str, pdf_hash: Optional[str]
     """Update PDF download status in CSV"""
     from config import CSV_CADRI_DOCS
 
-    df = CSVStore.load_csv(CSV_CADRI_DOCS)
+    with CSVStore.write_lock:
+        df = CSVStore.load_csv(CSV_CADRI_DOCS)
 
-    mask = df['numero_documento'] == numero_documento
-    df.loc[mask, 'status_pdf'] = status
+        mask = df['numero_documento'] == numero_documento
+        df.loc[mask, 'status_pdf'] = status
 
-    if pdf_hash:
-        df.loc[mask, 'pdf_hash'] = pdf_hash
+        if pdf_hash:
+            df.loc[mask, 'pdf_hash'] = pdf_hash
 
-    df.loc[mask, 'updated_at'] = datetime.now().isoformat()
+        df.loc[mask, 'updated_at'] = datetime.now().isoformat()
 
-    df.to_csv(CSV_CADRI_DOCS, index=False, encoding='utf-8')
+        df.to_csv(CSV_CADRI_DOCS, index=False, encoding='utf-8')
     logger.debug(f"Updated PDF status for {numero_documento}: {status}")
 
 
@@ -1,8 +1,19 @@
 import re
 import unicodedata
+from functools import lru_cache
 from typing import Optional, List, Tuple
 
 
+# Document number formats, tried in order
+_DOC_NUMBER_PATTERNS = [
+    re.compile(r'(\d{3,})'),  # Simple sequence of 3+ digits
+    re.compile(r'CAD[A-Z]*\s*[:-]?\s*(\d+)', re.IGNORECASE),  # CADRI format
+    re.compile(r'N[º°]?\s*(\d+)', re.IGNORECASE),  # Number with degree symbol
+]
+
+_DATE_BR_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+
+
 def normalize_text(text: str) -> str:
     """Normalize text: remove accents, extra spaces, uppercase"""
     if not text:
@@ -39,32 +50,28 @@ def format_cnpj(cnpj: str) -> str:
     return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
 
 
+@lru_cache(maxsize=50_000)
 def extract_document_number(text: str) -> Optional[str]:
     """Extract document number from various formats"""
     if not text:
         return None
 
     # Try various patterns
-    patterns = [
-        r'(\d{3,})',  # Simple sequence of 3+ digits
-        r'CAD[A-Z]*\s*[:-]?\s*(\d+)',  # CADRI format
-        r'N[º°]?\s*(\d+)',  # Number with degree symbol
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _DOC_NUMBER_PATTERNS:
+        match = pattern.search(text)
         if match:
             return match.group(1)
 
     return None
 
 
+@lru_cache(maxsize=50_000)
 def parse_date_br(date_str: str) -> Optional[str]:
     """Parse Brazilian date format (DD/MM/YYYY) to ISO format"""
     if not date_str:
         return None
 
-    match = re.search(r'(\d{1,2})/(\d{1,2})/(\d{4})', date_str)
+    match = _DATE_BR_RE.search(date_str)
     if match:
         day, month, year = match.groups()
         return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
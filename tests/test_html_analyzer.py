@@ -0,0 +1,82 @@
+import json
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from html_analyzer import HTMLAnalyzer
+from config import TARGET_DOC_TYPE
+
+
+DOCUMENT_PAGE = f"""<!DOCTYPE html>
+<!-- URL: https://autenticidade.cetesb.sp.gov.br/processo_resultado.php?cnpj=12345678000100 -->
+<html>
+<head><meta charset="utf-8"><title>Resultado</title></head>
+<body>
+    <table class="documentos">
+        <tr><th>Documento</th><th>Tipo</th><th>Data</th></tr>
+        <tr><td>123456</td><td>{TARGET_DOC_TYPE}</td><td>01/02/2024</td></tr>
+        <tr><td>654321</td><td>LICENCA DE OPERACAO</td><td>03/04/2024</td></tr>
+    </table>
+    <a href="documento.pdf">PDF</a>
+    <a href="autenticidade.php?doc=123456">Autenticidade</a>
+</body>
+</html>
+"""
+
+EMPTY_PAGE = """<html><body><p>Nenhum resultado encontrado</p></body></html>"""
+
+
+class TestHTMLAnalyzer:
+    """Test saved page analysis"""
+
+    def test_analyze_file(self, tmp_path):
+        """Test structure, text, table and link analysis of a results page"""
+        html_file = tmp_path / "page.html"
+        html_file.write_text(DOCUMENT_PAGE, encoding='utf-8')
+
+        analysis = HTMLAnalyzer().analyze_file(html_file)
+
+        assert analysis['url'].endswith("cnpj=12345678000100")
+        basic = analysis['basic_info']
+        assert basic['has_doctype'] and basic['encoding_meta']
+        assert (basic['title'], basic['table_count'], basic['link_count']) == ('Resultado', 1, 2)
+
+        text = analysis['text_analysis']
+        assert text['target_type_matches']
+        assert [doc['number'] for doc in text['potential_doc_numbers']][:2] == ['123456', '654321']
+        assert not text['has_error_messages']
+
+        table = analysis['table_analysis'][0]
+        assert table['headers'] == ['Documento', 'Tipo', 'Data']
+        assert [doc['document_number'] for doc in table['potential_documents']] == ['123456']
+
+        links = analysis['link_analysis']
+        assert [link['href'] for link in links['pdf_links']] == ['documento.pdf']
+        assert len(links['authenticity_links']) == 1
+
+    def test_batch_analyze_streams_report(self, tmp_path):
+        """Test that pool-analyzed files are written to one JSON report with matching summary"""
+        (tmp_path / "docs.html").write_text(DOCUMENT_PAGE, encoding='utf-8')
+        (tmp_path / "empty.html").write_text(EMPTY_PAGE, encoding='utf-8')
+
+        result = HTMLAnalyzer().batch_analyze(tmp_path, workers=2)
+
+        assert result['summary'] == {
+            'total_files': 2,
+            'analyzed': 2,
+            'with_cadri_content': 0,
+            'with_documents': 1,
+            'with_errors': 1,
+        }
+
+        report = json.loads(result['report_file'].read_text(encoding='utf-8'))
+        assert report['summary'] == result['summary']
+        assert sorted(Path(entry['file']).name for entry in report['files']) == ['docs.html', 'empty.html']
+
+    def test_batch_analyze_empty_dir(self, tmp_path):
+        """Test that a directory without HTML files yields no report"""
+        assert HTMLAnalyzer().batch_analyze(tmp_path) == {}
+        assert not (tmp_path / "batch_analysis_report.json").exists()
@@ -0,0 +1,176 @@
+import pytest
+import sys
+from pathlib import Path
+from bs4 import BeautifulSoup
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from improved_patterns import (
+    ImprovedDocumentExtractor, extract_cadri_documents_improved, extract_cadri_documents_batch
+)
+from config import TARGET_DOC_TYPE
+
+
+COMPANY_INFO = {'cnpj': '12345678000100', 'razao_social': 'Empresa Teste'}
+
+
+class TestImprovedDocumentExtractor:
+    """Test enhanced CADRI document extraction"""
+
+    @pytest.fixture
+    def table_html(self):
+        """Sample HTML with standard and nested tables"""
+        return """
+        <html>
+        <body>
+            <table>
+                <tr>
+                    <th>Número do Documento</th>
+                    <th>Tipo</th>
+                    <th>Data de Emissão</th>
+                </tr>
+                <tr>
+                    <td>123456</td>
+                    <td>CERT MOV RESIDUOS INT AMB</td>
+                    <td>01/01/2024</td>
+                </tr>
+            </table>
+            <table>
+                <tr><td>
+                    <table>
+                        <tr><td>CADRI 998877 de 05/05/2023 <a href="detalhe?doc=998877">Ver</a></td></tr>
+                    </table>
+                </td></tr>
+            </table>
+        </body>
+        </html>
+        """
+
+    @pytest.fixture
+    def element_html(self):
+        """Sample HTML with documents outside tables"""
+        return """
+        <html>
+        <body>
+            <div>Documento CADRI número 789012 emitido em 02/02/2024</div>
+            <ul><li>CADRI 555555 <a href="lista?doc=555555">Ver</a></li></ul>
+            <p>CERT MOVIMENTACAO 444444</p>
+        </body>
+        </html>
+        """
+
+    def test_extract_from_tables(self, table_html):
+        """Test table patterns"""
+        documents = extract_cadri_documents_improved(BeautifulSoup(table_html, 'html.parser'), COMPANY_INFO)
+
+        numbers = [doc['numero_documento'] for doc in documents]
+        assert numbers == ['123456', '998877']
+        assert documents[0]['data_emissao'] == '2024-01-01'
+        assert documents[0]['extraction_method'] == 'structured_table'
+        assert all(doc['tipo_documento'] == TARGET_DOC_TYPE for doc in documents)
+
+    def test_extract_from_elements(self, element_html):
+        """Test non-table patterns"""
+        documents = extract_cadri_documents_improved(BeautifulSoup(element_html, 'html.parser'), COMPANY_INFO)
+
+        numbers = {doc['numero_documento'] for doc in documents}
+        assert numbers == {'789012', '555555', '444444'}
+
+    @pytest.mark.parametrize('fixture_name', ['table_html', 'element_html'])
+    def test_lxml_backend_matches_soup(self, fixture_name, request):
+        """Test that the lxml fast path gives the same documents as BeautifulSoup"""
+        html = request.getfixturevalue(fixture_name)
+
+        soup_docs = extract_cadri_documents_improved(BeautifulSoup(html, 'html.parser'), COMPANY_INFO)
+        lxml_docs = extract_cadri_documents_improved(None, COMPANY_INFO, html=html)
+
+        assert lxml_docs == soup_docs
+
+    @pytest.mark.parametrize('backend', ['lxml', 'selectolax'])
+    def test_div_string_rule_matches_soup(self, backend):
+        """Test that divs are picked by BS4's string= rule: one string, possibly inside a single child tag"""
+        if backend == 'selectolax':
+            pytest.importorskip('selectolax')
+        html = """
+        <html>
+        <body>
+            <div><span>CADRI 123456 emitido em 03/03/2024</span></div>
+            <div>CADRI 222222 <b>emitido</b> em 04/04/2024</div>
+        </body>
+        </html>
+        """
+
+        soup_docs = extract_cadri_documents_improved(BeautifulSoup(html, 'html.parser'), COMPANY_INFO)
+        fast_docs = ImprovedDocumentExtractor.from_html(html, COMPANY_INFO, backend=backend).extract_all_documents()
+
+        assert [doc['numero_documento'] for doc in soup_docs] == ['123456']
+        assert fast_docs == soup_docs
+
+    @pytest.mark.parametrize('backend', ['lxml', 'selectolax'])
+    @pytest.mark.parametrize('html', [
+        "<table><tr><th>Documento</th><th>Tipo</th><th>Data</th></tr>"
+        "<tr><td>123456</td><td>CADRI</td><td>01/01/2024</td></tr></table>",
+        "<div>CADRI 123456 em 01/01/2024</div>",
+    ])
+    def test_single_root_fragment_matches_soup(self, backend, html):
+        """Test that a fragment whose root is the document element is searched like BS4 does"""
+        if backend == 'selectolax':
+            pytest.importorskip('selectolax')
+
+        soup_docs = extract_cadri_documents_improved(BeautifulSoup(html, 'html.parser'), COMPANY_INFO)
+        fast_docs = ImprovedDocumentExtractor.from_html(html, COMPANY_INFO, backend=backend).extract_all_documents()
+
+        assert [doc['numero_documento'] for doc in soup_docs] == ['123456']
+        assert fast_docs == soup_docs
+
+    def test_standard_failure_keeps_earlier_tables(self, monkeypatch):
+        """Test that tables covered by the standard pattern are still extracted when it fails on a later table"""
+        html = "".join(
+            "<table><tr><th>Documento</th><th>Tipo</th><th>Data</th></tr>"
+            f"<tr><td>{numero}</td><td>CERT MOV RESIDUOS INT AMB</td><td>01/01/2024</td></tr></table>"
+            for numero in ('123456', '654321')
+        )
+        standard_table_docs = ImprovedDocumentExtractor._standard_table_docs
+        calls = []
+
+        def failing_standard_table_docs(self, table, header_texts):
+            calls.append(table)
+            if len(calls) == 2:
+                raise ValueError("broken table")
+            return standard_table_docs(self, table, header_texts)
+
+        monkeypatch.setattr(ImprovedDocumentExtractor, '_standard_table_docs', failing_standard_table_docs)
+
+        documents = extract_cadri_documents_improved(None, COMPANY_INFO, html=html)
+
+        assert [doc['numero_documento'] for doc in documents] == ['123456', '654321']
+
+    def test_empty_page(self):
+        """Test that an empty page yields no documents"""
+        assert extract_cadri_documents_improved(None, COMPANY_INFO, html="") == []
+
+    def test_page_without_cadri_mentions(self):
+        """Test that pages never mentioning CADRI/certificates short-circuit to no documents"""
+        html = "<table><tr><th>Tipo</th><th>Número</th></tr><tr><td>LICENÇA PRÉVIA</td><td>123456</td></tr></table>"
+        assert extract_cadri_documents_improved(None, COMPANY_INFO, html=html) == []
+
+    def test_batch_matches_single_pages(self, table_html, element_html):
+        """Test that the process-pool batch returns per-page results in input order"""
+        pages = [(table_html, COMPANY_INFO), (element_html, COMPANY_INFO), ("", COMPANY_INFO)]
+
+        results = extract_cadri_documents_batch(pages, workers=2)
+
+        assert results == [extract_cadri_documents_improved(None, info, html=html) for html, info in pages]
+
+    @pytest.mark.parametrize('fixture_name', ['table_html', 'element_html'])
+    def test_selectolax_backend_matches_soup(self, fixture_name, request):
+        """Test that the selectolax backend gives the same documents as BeautifulSoup"""
+        pytest.importorskip('selectolax')
+        html = request.getfixturevalue(fixture_name)
+
+        soup_docs = extract_cadri_documents_improved(BeautifulSoup(html, 'html.parser'), COMPANY_INFO)
+        extractor = ImprovedDocumentExtractor.from_html(html, COMPANY_INFO, backend='selectolax')
+
+        assert extractor.backend == 'selectolax'
+        assert extractor.extract_all_documents() == soup_docs
@@ -0,0 +1,185 @@
+import asyncio
+import contextlib
+import json
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import fitz
+import httpx
+from openai import RateLimitError
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import llm_pdf_parser
+from llm_pdf_parser import LLMPDFParser
+import open_router_controller
+from open_router_controller import OpenRouterController
+from store_csv import CSVStore
+
+
+class StubOpenRouter:
+    """OpenRouterController stand-in that answers with canned responses"""
+
+    models = {'cost-optimized': 'google/gemini-2.5-flash'}
+
+    def __init__(self):
+        self.responses = []
+        self.messages = []
+
+    @contextlib.asynccontextmanager
+    async def async_session(self, http_client=None):
+        yield self
+
+    async def asingle_request(self, system_prompt, message, **kwargs):
+        self.messages.append(message)
+        return self.responses.pop(0)
+
+
+def _result(numero: str, residuo: str) -> dict:
+    return {'numero_documento': numero, 'items': [{'item_numero': '01', 'numero_residuo': residuo}]}
+
+
+@pytest.fixture
+def pdf_dir(tmp_path):
+    """Three one-page CADRI PDFs named by document number"""
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    for numero in ('111', '222', '333'):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), f"CADRI {numero} - Residuo D099 Classe I")
+        doc.save(pdf_dir / f"{numero}.pdf")
+        doc.close()
+    return pdf_dir
+
+
+@pytest.fixture
+def make_parser(tmp_path, pdf_dir, monkeypatch):
+    """Build LLMPDFParsers on temp CSVs and cache, with the stubbed OpenRouter and fallback"""
+    monkeypatch.setattr(llm_pdf_parser, 'LLM_PARSER_ENABLED', True)
+    monkeypatch.setattr(llm_pdf_parser, 'OpenRouterController', StubOpenRouter)
+    monkeypatch.setattr(llm_pdf_parser, 'CSV_CADRI_ITEMS', tmp_path / "cadri_itens.csv")
+    monkeypatch.setattr(llm_pdf_parser, 'CSV_CADRI_ITEMS_STAGING', tmp_path / "cadri_itens_staging.csv")
+    monkeypatch.setattr(llm_pdf_parser, 'LLM_CACHE_FILE', tmp_path / "llm_cache.sqlite")
+
+    def make():
+        parser = LLMPDFParser()
+        parser.pdf_dir = pdf_dir
+        parser.max_text_tokens = 0  # truncate by characters, no tokenizer download
+        parser.docs_per_request = 3
+        parser._fallback_to_regex_parser = lambda pdf_path: [
+            {'numero_documento': pdf_path.stem, 'item_numero': '01', 'numero_residuo': 'FALLBACK'}
+        ]
+        return parser
+
+    return make
+
+
+class TestLLMPDFParser:
+    """Test the LLM parsing path against a stubbed OpenRouter"""
+
+    def test_multi_document_response_and_fallback(self, make_parser, tmp_path):
+        """Test that results are matched by document number and missing ones are retried alone"""
+        parser = make_parser()
+        # 222 is missing from the multi-document answer, and its own request is not JSON
+        parser.openrouter.responses = [
+            json.dumps({'results': [_result('333', 'K001'), _result('111', 'D099')]}),
+            "Não consegui extrair",
+        ]
+
+        stats = parser.parse_all_pdfs()
+
+        assert len(parser.openrouter.messages) == 2
+        assert "222" in parser.openrouter.messages[1] and "111" not in parser.openrouter.messages[1]
+        assert stats['processed_pdfs'] == 3
+        assert stats['llm_errors'] == 1
+
+        df = CSVStore.load_csv(tmp_path / "cadri_itens.csv")
+        residuos = dict(zip(df['numero_documento'], df['numero_residuo']))
+        assert residuos == {'111': 'D099', '222': 'FALLBACK', '333': 'K001'}
+
+    def test_attempted_documents_are_not_resent(self, make_parser):
+        """Test that a later pass on the same parser skips documents that fell back or had no items"""
+        parser = make_parser()
+        parser._fallback_to_regex_parser = lambda pdf_path: []
+        parser.openrouter.responses = [json.dumps({'results': [_result('111', 'D099')]}), "", ""]
+
+        parser.parse_all_pdfs()
+        assert len(parser.openrouter.messages) == 3
+
+        parser.parse_all_pdfs()
+        assert len(parser.openrouter.messages) == 3
+
+    def test_fallback_runs_off_event_loop(self, make_parser, pdf_dir):
+        """Test that the synchronous regex/Docling fallback is not run on the event loop thread"""
+        parser = make_parser()
+        parser.openrouter.responses = [""]
+        loops = []
+
+        def fallback(pdf_path):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return [{'numero_documento': pdf_path.stem, 'item_numero': '01', 'numero_residuo': 'FALLBACK'}]
+
+        parser._fallback_to_regex_parser = fallback
+
+        items = parser.parse_pdf(pdf_dir / "111.pdf")
+
+        assert loops == [None]
+        assert [item['numero_residuo'] for item in items] == ['FALLBACK']
+
+    def test_response_cache_hit(self, make_parser, pdf_dir):
+        """Test that a validated response is reused for the same model, prompt and text"""
+        pdf_path = pdf_dir / "111.pdf"
+
+        first = make_parser()
+        first.openrouter.responses = [json.dumps(_result('111', 'D099'))]
+        items = first.parse_pdf(pdf_path)
+
+        second = make_parser()
+        cached = second.parse_pdf(pdf_path, force_reparse=True)
+
+        assert second.openrouter.messages == []
+        assert second.stats['llm_cache_hits'] == 1
+        assert [(item['numero_documento'], item['numero_residuo']) for item in cached] == \
+            [(item['numero_documento'], item['numero_residuo']) for item in items] == [('111', 'D099')]
+
+
+class TestOpenRouterRetry:
+    """Test OpenRouterController's retry of transient failures"""
+
+    def test_rate_limit_honors_retry_after(self, monkeypatch):
+        """Test that a 429 is retried once after the server's Retry-After delay"""
+        monkeypatch.setenv('OPENROUTER_API_KEY', 'test-key')
+        controller = OpenRouterController()
+
+        request = httpx.Request('POST', 'https://openrouter.ai/api/v1/chat/completions')
+        rate_limited = RateLimitError(
+            'rate limited', response=httpx.Response(429, headers={'retry-after': '2'}, request=request), body=None
+        )
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise rate_limited
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"items": []}'))])
+
+        controller.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+        sleeps = []
+
+        async def sleep(delay):
+            sleeps.append(delay)
+
+        monkeypatch.setattr(open_router_controller.asyncio, 'sleep', sleep)
+
+        response = asyncio.run(controller.asingle_request("system", "message"))
+
+        assert response == '{"items": []}'
+        assert len(calls) == 2
+        assert sleeps == [2.0]
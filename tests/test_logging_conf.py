@@ -0,0 +1,48 @@
+import pytest
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import logging_conf
+from logging_conf import init_worker_logging, setup_logging
+
+
+def _log_error_in_worker(message: str) -> bool:
+    """Log from a pool worker (module level so it can be pickled)"""
+    logging_conf.logger.error(message)
+    return True
+
+
+@pytest.fixture
+def tmp_log_file(tmp_path, monkeypatch):
+    """Point the file handler at a temp log, restoring the default setup afterwards"""
+    log_file = tmp_path / "scraper.log"
+    monkeypatch.setattr(logging_conf, 'LOG_FILE', log_file)
+    setup_logging()
+    yield log_file
+    monkeypatch.undo()
+    setup_logging()
+
+
+def test_worker_logs_reach_log_file(tmp_log_file):
+    """Test that records logged in pool workers are written, not lost in an undrained queue"""
+    with ProcessPoolExecutor(max_workers=2, initializer=init_worker_logging) as executor:
+        assert all(executor.map(_log_error_in_worker, ['worker error 1', 'worker error 2']))
+
+    setup_logging()  # stops the parent's listener, flushing its queue
+
+    content = tmp_log_file.read_text(encoding='utf-8')
+    assert 'worker error 1' in content
+    assert 'worker error 2' in content
+
+
+def test_parent_logs_reach_log_file(tmp_log_file):
+    """Test that the queued parent handler writes once the listener is stopped"""
+    logging_conf.logger.warning('parent warning')
+
+    setup_logging()
+
+    assert 'parent warning' in tmp_log_file.read_text(encoding='utf-8')
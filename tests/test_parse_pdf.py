@@ -6,6 +6,7 @@ import fitz  # PyMuPDF
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+import parse_pdf
 from parse_pdf import PDFParser
 from utils_text import normalize_classe, extract_quantity_unit, is_valid_residue_name
 
@@ -73,6 +74,17 @@ class TestPDFParser:
         assert item['classe'] == "2A"
         assert item['estado_fisico'] == "pastoso"
 
+    def test_parse_table_row_double_space_in_tab_cell(self, parser):
+        """Test that a double space inside a tab-separated cell does not split it"""
+        row = "Óleo  Usado\tI\tLíquido\t1000 L"
+        item = parser.parse_table_row(row, 1, 1)
+
+        assert item is not None
+        assert item['residuo'] == "Óleo  Usado"
+        assert item['classe'] == "1"
+        assert item['estado_fisico'] == "líquido"
+        assert item['quantidade'] == "1000"
+
     def test_extract_from_table(self, parser):
         """Test table extraction from text"""
         text = """
@@ -110,6 +122,23 @@ class TestPDFParser:
         residuos = [item['residuo'] for item in items]
         assert any('Óleo' in r or 'óleo' in r.lower() for r in residuos)
 
+    def test_parse_all_pending_single_upsert(self, parser, create_test_pdf, monkeypatch):
+        """Test that pending PDFs are parsed in worker processes, staged and saved in one upsert"""
+        upserts = []
+        staging = create_test_pdf.parent / "staging.csv"
+        monkeypatch.setattr(parse_pdf, 'PDF_DIR', create_test_pdf.parent)
+        monkeypatch.setattr(parse_pdf, 'CSV_CADRI_ITEMS_REGEX_STAGING', staging)
+        monkeypatch.setattr(parse_pdf, 'get_unparsed_pdfs', lambda: [create_test_pdf.stem, 'missing'])
+        monkeypatch.setattr(parse_pdf.CSVStore, 'upsert', lambda df, path, keys: upserts.append(df))
+
+        total = parser.parse_all_pending()
+
+        expected = parser.parse_pdf(create_test_pdf)
+        assert total == len(expected) > 0
+        assert len(upserts) == 1
+        assert list(upserts[0]['residuo']) == [item['residuo'] for item in expected]
+        assert not staging.exists()
+
 
 class TestUtilityFunctions:
     """Test PDF parsing utility functions"""
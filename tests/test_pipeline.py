@@ -0,0 +1,245 @@
+import asyncio
+import pytest
+import signal
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pipeline as pipeline_module
+from pipeline import Pipeline
+from store_csv import CSVStore
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Pipeline whose seed state saves are counted instead of written"""
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    monkeypatch.setattr(pipeline_module, 'CHECKPOINT_INTERVAL', 2)
+
+    p = Pipeline()
+    p.saves = 0
+
+    def save_state():
+        p.saves += 1
+
+    monkeypatch.setattr(p.seed_manager, 'save_state', save_state)
+    yield p
+
+    p.close()
+    for sig, handler in handlers.items():
+        signal.signal(sig, handler)
+
+
+class TestCheckpoint:
+    """Test throttled checkpoint saves"""
+
+    def test_first_due_save_is_immediate(self, pipeline):
+        """Test that the first save is not held back by CHECKPOINT_MIN_SECONDS"""
+        pipeline.checkpoint()
+        assert pipeline.saves == 0
+
+        pipeline.checkpoint()
+        assert pipeline.saves == 1
+
+    def test_deferred_save_is_flushed(self, pipeline, monkeypatch):
+        """Test that a save deferred by CHECKPOINT_MIN_SECONDS happens on flush"""
+        monkeypatch.setattr(pipeline_module, 'CHECKPOINT_MIN_SECONDS', 3600)
+
+        for _ in range(4):
+            pipeline.checkpoint()
+        assert pipeline.saves == 1  # second due save is throttled
+
+        pipeline.flush_checkpoint()
+        assert pipeline.saves == 2
+
+        pipeline.flush_checkpoint()
+        assert pipeline.saves == 2  # nothing left to save
+
+    def test_run_stage_flushes_deferred_save(self, pipeline, monkeypatch):
+        """Test that a stage ending with a deferred save still writes it"""
+        monkeypatch.setattr(pipeline_module, 'CHECKPOINT_MIN_SECONDS', 3600)
+        monkeypatch.setattr(pipeline_module.CSVSchemas, 'init_all', staticmethod(lambda: None))
+
+        def stage_parse(**kwargs):
+            for _ in range(4):
+                pipeline.checkpoint()
+
+        monkeypatch.setattr(pipeline, 'stage_parse', stage_parse)
+
+        asyncio.run(pipeline.run_stage('parse'))
+
+        assert pipeline.saves == 2
+
+
+class TestStageList:
+    """Test concurrent company searches"""
+
+    def test_searches_run_concurrently_and_dedup(self, pipeline, monkeypatch, tmp_path):
+        """Test that searches overlap up to LIST_CONCURRENCY and repeated company URLs are dropped"""
+        monkeypatch.setattr(pipeline_module, 'CSV_DIR', tmp_path)
+        monkeypatch.setattr(pipeline_module, 'LIST_CONCURRENCY', 2)
+        running = {'now': 0, 'max': 0}
+
+        class FakeListScraper:
+            def __init__(self, seed_manager):
+                pass
+
+            async def search_by_razao_social(self, seed):
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+                await asyncio.sleep(0.01)
+                running['now'] -= 1
+                # Every seed finds the shared company, once with a trailing slash
+                shared = 'https://example.com/empresa?cnpj=1' + ('/' if seed == 'BBB' else '')
+                return [shared, {'url': f'https://example.com/empresa?seed={seed}', 'skip_detail_stage': True}]
+
+        monkeypatch.setattr(pipeline_module, 'ListScraper', FakeListScraper)
+
+        results = asyncio.run(pipeline.stage_list(seeds=['AAA', 'BBB', 'CCC']))
+
+        assert running['max'] == 2
+        assert [r['url'] for r in results] == [
+            'https://example.com/empresa?cnpj=1',
+            'https://example.com/empresa?seed=AAA',
+            'https://example.com/empresa?seed=BBB',
+            'https://example.com/empresa?seed=CCC',
+        ]
+
+        saved = pd.read_csv(tmp_path / "pending_urls.csv")
+        assert list(saved.columns) == ['url', 'skip_detail_stage']
+        assert list(saved['url']) == [r['url'] for r in results]
+
+
+class TestStageDetail:
+    """Test chunked detail scraping with pooled scrapers"""
+
+    def test_chunks_share_pooled_scrapers(self, pipeline, monkeypatch):
+        """Test that every unique URL is scraped once and scrapers are reused, then closed"""
+        monkeypatch.setattr(pipeline_module, 'DETAIL_CHUNK_SIZE', 2)
+        monkeypatch.setattr(pipeline_module, 'DETAIL_CONCURRENCY', 2)
+        scraped, scrapers = [], []
+
+        class FakeDetailScraper:
+            def __init__(self):
+                self.closed = False
+                scrapers.append(self)
+
+            def process_url_list(self, urls):
+                scraped.extend(urls)
+                return len(urls)
+
+            def __exit__(self, exc_type, exc_val, exc_tb):
+                self.closed = True
+
+        monkeypatch.setattr(pipeline_module, 'DetailScraper', FakeDetailScraper)
+        urls = [f'https://example.com/empresa?cnpj={i}' for i in range(7)]
+
+        assert pipeline.stage_detail(urls + urls[:3]) == 7
+        assert pipeline.stage_detail([{'url': url} for url in urls]) == 7
+
+        assert sorted(scraped) == sorted(urls * 2)
+        assert len(scrapers) <= 2  # at most one per worker thread, kept between calls
+
+        pipeline.close()
+        assert all(scraper.closed for scraper in scrapers)
+
+
+class TestStageParse:
+    """Test parser reuse between parse passes"""
+
+    def test_parser_is_reused_between_passes(self, pipeline, monkeypatch):
+        """Test that repeated stage_parse calls share one parser instead of rebuilding it"""
+        import llm_pdf_parser
+        created = []
+
+        class FakeLLMPDFParser:
+            def __init__(self):
+                self.passes = 0
+                created.append(self)
+
+            def parse_all_pdfs(self, force_reparse=False):
+                self.passes += 1
+                return {'passes': self.passes}
+
+        monkeypatch.setattr(llm_pdf_parser, 'LLMPDFParser', FakeLLMPDFParser)
+
+        pipeline.stage_parse(parser_method="llm")
+        assert pipeline.stage_parse(parser_method="llm") == {'passes': 2}
+        assert len(created) == 1
+
+
+class TestRunAll:
+    """Test stage overlap in the complete pipeline"""
+
+    def test_pdfs_are_parsed_while_downloading(self, pipeline, monkeypatch, tmp_path):
+        """Test that parse passes run during downloads and a final pass picks up the rest"""
+        monkeypatch.setattr(pipeline_module, 'PARSE_POLL_SECONDS', 0.01)
+        monkeypatch.setattr(pipeline_module.CSVSchemas, 'init_all', staticmethod(lambda: None))
+        docs_csv = tmp_path / "cadri_documentos.csv"
+        items_csv = tmp_path / "cadri_itens.csv"
+        parsed_midway = threading.Event()
+        passes = []
+
+        async def stage_list(cnpjs=None):
+            return ['https://example.com/empresa']
+
+        async def stage_detail_async(urls, iteration):
+            return len(urls)
+
+        async def stage_pdf():
+            for i in range(5):
+                df = pd.DataFrame([{'numero_documento': str(i), 'status_pdf': 'downloaded'}])
+                await asyncio.to_thread(CSVStore.upsert, df, docs_csv, ['numero_documento'])
+                if i == 2:
+                    # Hold the downloads until a pass has parsed the first PDFs
+                    assert await asyncio.to_thread(parsed_midway.wait, 5)
+            return {'downloaded': 5}
+
+        def stage_parse(parser_method="auto"):
+            docs = CSVStore.load_csv(docs_csv)
+            if docs.empty:
+                return {'parsed': 0}
+            items = pd.DataFrame({'numero_documento': docs['numero_documento'], 'residuo': 'Óleo'})
+            CSVStore.upsert(items, items_csv, ['numero_documento'])
+            passes.append(len(docs))
+            if len(docs) < 5:
+                parsed_midway.set()
+            return {'parsed': len(docs)}
+
+        monkeypatch.setattr(pipeline, 'stage_list', stage_list)
+        monkeypatch.setattr(pipeline, '_stage_detail_async', stage_detail_async)
+        monkeypatch.setattr(pipeline, 'stage_pdf', stage_pdf)
+        monkeypatch.setattr(pipeline, 'stage_parse', stage_parse)
+
+        asyncio.run(pipeline.run_all(max_iterations=1))
+
+        assert min(passes) < 5  # parsed before the downloads finished
+        assert passes[-1] == 5  # final pass after them
+        assert sorted(CSVStore.load_csv(items_csv)['numero_documento']) == [str(i) for i in range(5)]
+
+    def test_listed_urls_are_scraped_when_stopping(self, pipeline, monkeypatch):
+        """Test that URLs listed alongside an empty detail iteration are still scraped before stopping"""
+        monkeypatch.setattr(pipeline_module.CSVSchemas, 'init_all', staticmethod(lambda: None))
+        listed, scraped = [], []
+
+        async def stage_list(cnpjs=None):
+            urls = [f'https://example.com/empresa?iteracao={len(listed) + 1}']
+            listed.append(urls)
+            return urls
+
+        async def stage_detail_async(urls, iteration):
+            scraped.append(urls)
+            return 0  # no documents: stop after this iteration
+
+        monkeypatch.setattr(pipeline, 'stage_list', stage_list)
+        monkeypatch.setattr(pipeline, '_stage_detail_async', stage_detail_async)
+
+        asyncio.run(pipeline.run_all(max_iterations=5))
+
+        assert len(listed) == 2  # iteration 2 listed while iteration 1 was scraped
+        assert scraped == listed